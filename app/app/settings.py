@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import copy
 import os
 from pathlib import Path
 
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core.apps.CoreConfig',
     'rest_framework',
     'rest_framework.authtoken',
@@ -47,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -80,6 +84,10 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# DB_POOL=1 uses psycopg's connection pool, which replaces persistent
+# connections, so CONN_MAX_AGE only applies without it
+DB_POOL = bool(int(os.environ.get('DB_POOL', 0)))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -88,7 +96,105 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASS', 'postgres'),
         'HOST': os.environ.get('DB_HOST', 'db'),  # Match the service name in docker-compose
         'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(
+            os.environ.get('DB_CONN_MAX_AGE', 60)
+        ),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        'OPTIONS': {},
+    }
+}
+
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        # Seconds a request waits for a free connection before failing
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
     }
+
+# Comma separated hosts of read replicas of the default database, reads are
+# spread over them by core.routers.ReplicaRouter. DB_REPLICA_NAME points
+# them at another database, e.g. a second database on the same local server
+REPLICA_DATABASES = []
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1
+):
+    alias = f'replica{index}'
+    DATABASES[alias] = copy.deepcopy(DATABASES['default'])
+    DATABASES[alias].update({
+        'HOST': host,
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    })
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Serve recipe, tag and ingredient reads with async views, for ASGI servers
+ASYNC_READ_VIEWS = bool(int(os.environ.get('ASYNC_READ_VIEWS', 0)))
+
+# How recipe lists are built: values reads values() rows and builds the
+# output directly, json has Postgres build the JSON of every recipe and
+# serializer uses RecipeSerializer on model instances
+RECIPE_LIST_MODE = os.environ.get('RECIPE_LIST_MODE', 'values')
+
+# Seconds users read from the primary after writing, cover the replica lag
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The default cache lives inside the process, gunicorn.conf.py refuses to
+# start several workers unless CACHE_BACKEND points them at a shared cache
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Token authentication cache, CACHE_ALIAS enables the shared cache layer
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_MAX_SIZE', 10000)),
+    'LOCAL_TTL': int(os.environ.get('TOKEN_AUTH_CACHE_LOCAL_TTL', 30)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 300)),
+    'CACHE_ALIAS': os.environ.get('TOKEN_AUTH_CACHE_ALIAS') or None,
+}
+
+# Seconds cached tag and ingredient list responses are kept
+RECIPE_ATTR_CACHE_TIMEOUT = int(os.environ.get('RECIPE_ATTR_CACHE_TIMEOUT', 300))
+
+
+# Request timings, see core.middleware.PerformanceMiddleware. With
+# PERFORMANCE_METRICS routes of PERFORMANCE_METRICS_NAMESPACES are added to
+# histograms served at /metrics to METRICS_ALLOWED_IPS, per worker process,
+# along with the statistics of the connection pool of the worker
+PERFORMANCE_METRICS = bool(int(os.environ.get('PERFORMANCE_METRICS', 0)))
+PERFORMANCE_METRICS_NAMESPACES = ['recipe', 'user']
+METRICS_ALLOWED_IPS = os.environ.get(
+    'METRICS_ALLOWED_IPS', '127.0.0.1'
+).split(',')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # JSON line per request at INFO, quiet unless enabled
+        'core.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('PERFORMANCE_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
 }
 
 
@@ -132,6 +238,18 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Threads per process creating recipe image renditions, 0 creates them in
+# the upload request
+RECIPE_RENDITION_WORKERS = int(os.environ.get('RECIPE_RENDITION_WORKERS', 2))
+
+# Limits enforced while a recipe image upload streams in
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 20 * 2**20)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 50_000_000)
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -141,6 +259,18 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 100)),
+    # JSON through orjson when installed, the browsable API only in DEBUG
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipe.renderers.FastJSONRenderer',
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'recipe.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
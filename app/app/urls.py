@@ -21,6 +21,8 @@ from django.conf import settings
 
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from core import views as core_views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
@@ -30,7 +32,8 @@ urlpatterns = [
         name='api-docs'
     ),
     path('api/user/', include('user.urls')),
-    path('api/recipe', include('recipe.urls'))
+    path('api/recipe', include('recipe.urls')),
+    path('metrics', core_views.metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,12 @@
+"""
+Performance benchmarks, run them with `python manage.py benchmark`
+"""
+from . import api, json_rendering, recipe_list, serving, token_auth
+
+BENCHMARKS = {
+    'api': api.run,
+    'json_rendering': json_rendering.run,
+    'recipe_list': recipe_list.run,
+    'serving': serving.run,
+    'token_auth': token_auth.run,
+}
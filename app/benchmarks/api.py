@@ -0,0 +1,161 @@
+"""
+Benchmark the API endpoints through their URL routes on seeded data
+
+Every size seeds its own user with that many recipes, each linked to a
+random number of the user's tags and ingredients, and requests the
+endpoints with the Django test client as that user.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Change, Ingredient, Recipe, Tag
+from core.sync import record_changes
+
+from .utils import measure
+
+
+SIZES = (10, 1000, 100000)
+SEED = 1234
+BATCH_SIZE = 5000
+TAGS = 50
+INGREDIENTS = 200
+# Number of tags and ingredients per recipe
+TAG_FAN_OUT = (0, 5)
+INGREDIENT_FAN_OUT = (1, 12)
+
+WORDS = [
+    'chicken', 'tomato', 'garlic', 'lemon', 'basil', 'rice', 'noodle',
+    'curry', 'beef', 'mushroom', 'spinach', 'bean', 'potato', 'ginger',
+    'salmon', 'pepper', 'cheese', 'onion', 'pork', 'coconut',
+]
+
+
+def _link(through, field: str, recipes: list, objects: list, fan_out, rng):
+    """Link every recipe to a random sample of objects"""
+    links = [
+        through(recipe_id=recipe.id, **{f'{field}_id': obj.id})
+        for recipe in recipes
+        for obj in rng.sample(objects, rng.randint(*fan_out))
+    ]
+    through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+
+def seed_user(size: int, rng: random.Random):
+    """Create a user owning size recipes with tags and ingredients"""
+    user = get_user_model().objects.create_user(
+        email=f'bench-api-{size}@example.com',
+        password='benchpass123'
+    )
+    tags = Tag.objects.bulk_create([
+        Tag(user=user, name=f'{rng.choice(WORDS)} tag {index}')
+        for index in range(TAGS)
+    ])
+    ingredients = Ingredient.objects.bulk_create([
+        Ingredient(user=user, name=f'{rng.choice(WORDS)} {index}')
+        for index in range(INGREDIENTS)
+    ])
+
+    recipe_ids = []
+    for start in range(0, size, BATCH_SIZE):
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=' '.join(rng.sample(WORDS, 3)).capitalize(),
+                time_minutes=rng.randint(5, 180),
+                price=Decimal(rng.randint(100, 9999)) / 100,
+                description=' '.join(rng.choices(WORDS, k=20)),
+            )
+            for _ in range(start, min(start + BATCH_SIZE, size))
+        ])
+        _link(Recipe.tags.through, 'tag', recipes, tags, TAG_FAN_OUT, rng)
+        _link(
+            Recipe.ingredients.through, 'ingredient',
+            recipes, ingredients, INGREDIENT_FAN_OUT, rng
+        )
+        recipe_ids.extend(recipe.id for recipe in recipes)
+
+    # Bulk inserts skip the signals keeping search vectors current and
+    # recording the changes synced to clients
+    Recipe.objects.filter(user=user).update_search_vector()
+    for model, ids in [
+        (Tag, [tag.id for tag in tags]),
+        (Ingredient, [ingredient.id for ingredient in ingredients]),
+        (Recipe, recipe_ids),
+    ]:
+        record_changes(model, user.pk, ids)
+
+    # Queries are planned from statistics of the seeded rows, autovacuum
+    # does not see rows of the transactions tests run in
+    tables = [
+        model._meta.db_table
+        for model in (
+            Recipe, Tag, Ingredient, Change,
+            Recipe.tags.through, Recipe.ingredients.through,
+        )
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {", ".join(tables)}')
+
+    return user, tags
+
+
+def endpoints(user, tags: list) -> dict:
+    """Return the URL and query parameters of every benchmarked endpoint"""
+    recipe = Recipe.objects.filter(user=user).order_by('id').first()
+    tag_ids = ','.join(str(tag.id) for tag in tags[:2])
+
+    return {
+        'recipe list': (reverse('recipe:recipe-list'), {}),
+        'recipe list by tags': (
+            reverse('recipe:recipe-list'), {'tags': tag_ids}
+        ),
+        'recipe search': (reverse('recipe:recipe-list'), {'search': 'curry'}),
+        'recipe detail': (
+            reverse('recipe:recipe-detail', args=[recipe.id]), {}
+        ),
+        'tag list': (reverse('recipe:tag-list'), {}),
+        'tag counts': (
+            reverse('recipe:tag-list'),
+            {'assigned_only': 1, 'with_counts': 1},
+        ),
+        'tag autocomplete': (reverse('recipe:tag-list'), {'q': 'cur'}),
+        'ingredient list': (reverse('recipe:ingredient-list'), {}),
+        'user me': (reverse('user:me'), {}),
+    }
+
+
+def _get(client: Client, url: str, params: dict):
+    """Request url, failing on error responses"""
+    response = client.get(url, params)
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {url} returned {response.status_code}')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+def run(iterations: int = 1000, sizes: tuple[int] = SIZES) -> dict:
+    """Return latency and queries per endpoint for every size"""
+    rng = random.Random(SEED)
+
+    results = {}
+    for size in sizes:
+        user, tags = seed_user(size, rng)
+        client = Client(
+            headers={
+                'Authorization':
+                    f'Token {Token.objects.create(user=user).key}'
+            }
+        )
+
+        for name, (url, params) in endpoints(user, tags).items():
+            results[f'{name} @{size}'] = measure(
+                lambda: _get(client, url, params), iterations
+            )
+
+    return results
@@ -0,0 +1,90 @@
+"""
+Benchmark rendering and parsing recipe lists with DRF's JSON classes and
+the orjson based ones
+"""
+import io
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.parsers import FastJSONParser
+from recipe.renderers import FastJSONRenderer
+from recipe.serializers import RecipeSerializer
+
+from .utils import measure
+
+
+SIZES = (1000,)
+
+
+def recipe_list(size: int) -> list[dict]:
+    """Return size serialized recipes with tags and ingredients"""
+    user = get_user_model().objects.create_user(
+        email=f'bench-json-{size}@example.com',
+        password='benchpass123'
+    )
+    tags = Tag.objects.get_or_create_many(user, ['Vegan', 'Dinner', 'Quick'])
+    ingredients = Ingredient.objects.get_or_create_many(
+        user, ['Rice', 'Beans', 'Lime', 'Chili']
+    )
+    recipes = Recipe.objects.bulk_create([
+        Recipe(
+            user=user,
+            title=f'Rice and beans {index}',
+            time_minutes=20,
+            price=Decimal('4.75'),
+            link='https://example.com/rice-and-beans',
+        )
+        for index in range(size)
+    ])
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for recipe in recipes for tag in tags
+    ])
+    Recipe.ingredients.through.objects.bulk_create([
+        Recipe.ingredients.through(
+            recipe_id=recipe.id, ingredient_id=ingredient.id
+        )
+        for recipe in recipes for ingredient in ingredients
+    ])
+
+    queryset = Recipe.objects.filter(user=user).prefetch_related(
+        'tags', 'ingredients'
+    )
+    return RecipeSerializer(queryset, many=True).data
+
+
+def run(iterations: int = 1000, sizes: tuple[int] = SIZES) -> dict:
+    """Return render and parse latency of recipe lists per JSON class"""
+    results = {}
+    for size in sizes:
+        data = {'next': None, 'previous': None, 'results': recipe_list(size)}
+        # Prices as Decimal, like with COERCE_DECIMAL_TO_STRING off
+        decimals = {
+            **data,
+            'results': [
+                {**recipe, 'price': Decimal(recipe['price'])}
+                for recipe in data['results']
+            ],
+        }
+        body = JSONRenderer().render(data)
+
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            name = type(renderer).__name__
+            results[f'{name} @{size}'] = measure(
+                lambda: renderer.render(data), iterations
+            )
+            results[f'{name} decimals @{size}'] = measure(
+                lambda: renderer.render(decimals), iterations
+            )
+
+        for parser in (JSONParser(), FastJSONParser()):
+            results[f'{type(parser).__name__} @{size}'] = measure(
+                lambda: parser.parse(io.BytesIO(body)), iterations
+            )
+
+    return results
@@ -0,0 +1,48 @@
+"""
+Benchmark large recipe list pages per RECIPE_LIST_MODE
+"""
+import random
+
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from .api import SEED, seed_user
+from .utils import measure
+
+
+SIZES = (1000,)
+PAGE_SIZE = 500
+MODES = ('serializer', 'values', 'json')
+
+
+def _get(client, url: str, params: dict) -> bytes:
+    """Return the body of a response, reading streamed ones to the end"""
+    response = client.get(url, params)
+    if response.streaming:
+        return b''.join(response.streaming_content)
+
+    return response.content
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+def run(iterations: int = 1000, sizes: tuple[int] = SIZES) -> dict:
+    """Return latency and queries of a recipe list page per list mode"""
+    rng = random.Random(SEED)
+    url = reverse('recipe:recipe-list')
+
+    results = {}
+    for size in sizes:
+        user, _tags = seed_user(size, rng)
+        token = Token.objects.create(user=user)
+        client = Client(headers={'Authorization': f'Token {token.key}'})
+
+        for mode in MODES:
+            with override_settings(RECIPE_LIST_MODE=mode):
+                results[f'{mode} @{size}'] = measure(
+                    lambda: _get(client, url, {'page_size': PAGE_SIZE}),
+                    iterations
+                )
+
+    return results
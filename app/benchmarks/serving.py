@@ -0,0 +1,140 @@
+"""
+Benchmark concurrent recipe list reads through sync and async views
+
+The sync view runs in a pool of threads like gthread WSGI workers, the
+async view runs as coroutines on one event loop like uvicorn ASGI workers.
+"""
+import asyncio
+import threading
+import time
+from decimal import Decimal
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import AsyncRequestFactory, RequestFactory, override_settings
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe
+from recipe.views import RecipeViewSet
+
+from .utils import summarize
+
+
+RECIPES = 50
+
+
+def _shares(iterations: int, concurrency: int) -> list[int]:
+    """Split iterations over concurrency workers"""
+    return [
+        iterations // concurrency + (index < iterations % concurrency)
+        for index in range(concurrency)
+    ]
+
+
+def _run_wsgi(view, request, iterations: int, concurrency: int) -> dict:
+    """Call the sync view from concurrency threads"""
+    samples = []
+
+    def worker(count):
+        for _ in range(count):
+            start = time.perf_counter()
+            view(request).render()
+            samples.append(time.perf_counter() - start)
+        connections.close_all()
+
+    threads = [
+        threading.Thread(target=worker, args=(count,))
+        for count in _shares(iterations, concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return _with_throughput(summarize(samples), iterations, start)
+
+
+def _run_asgi(view, request, iterations: int, concurrency: int) -> dict:
+    """Call the async view from concurrency coroutines"""
+    samples = []
+
+    async def worker(count):
+        # Each worker has its own thread for ORM calls, like a request
+        async with ThreadSensitiveContext():
+            for _ in range(count):
+                start = time.perf_counter()
+                response = await view(request)
+                response.render()
+                samples.append(time.perf_counter() - start)
+            await sync_to_async(connections.close_all)()
+
+    async def main():
+        await asyncio.gather(*[
+            worker(count) for count in _shares(iterations, concurrency)
+        ])
+
+    start = time.perf_counter()
+    asyncio.run(main())
+
+    return _with_throughput(summarize(samples), iterations, start)
+
+
+def _with_throughput(stats: dict, iterations: int, start: float) -> dict:
+    """Replace the serial rate of stats with the concurrent throughput"""
+    stats['rps'] = round(iterations / (time.perf_counter() - start), 1)
+    return stats
+
+
+def _compare(sync_view, async_view, path, headers, iterations, concurrency):
+    """Return the results of both server modes after a warm up"""
+    for _ in range(10):
+        sync_view(RequestFactory().get(path, headers=headers)).render()
+
+    return {
+        f'wsgi x{concurrency} threads': _run_wsgi(
+            sync_view,
+            RequestFactory().get(path, headers=headers),
+            iterations,
+            concurrency,
+        ),
+        f'asgi x{concurrency} coroutines': _run_asgi(
+            async_view,
+            AsyncRequestFactory().get(path, headers=headers),
+            iterations,
+            concurrency,
+        ),
+    }
+
+
+def run(iterations: int = 1000, concurrency: int = 16) -> dict:
+    """Return latency and throughput of the recipe list per server mode"""
+    user = get_user_model().objects.create_user(
+        email='bench-serving@example.com',
+        password='benchpass123'
+    )
+    Recipe.objects.bulk_create([
+        Recipe(
+            user=user,
+            title=f'Recipe {index}',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+        for index in range(RECIPES)
+    ])
+    headers = {'Authorization': f'Token {Token.objects.create(user=user).key}'}
+    path = '/api/recipe/recipes/'
+
+    with override_settings(ASYNC_READ_VIEWS=False):
+        sync_view = RecipeViewSet.as_view({'get': 'list'})
+    with override_settings(ASYNC_READ_VIEWS=True):
+        async_view = RecipeViewSet.as_view({'get': 'list'})
+
+    # Pagination links are built from the host of the request factory
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        return _compare(
+            sync_view, async_view, path, headers, iterations, concurrency
+        )
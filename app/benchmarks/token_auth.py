@@ -0,0 +1,35 @@
+"""
+Benchmark token authentication with and without the lookup cache
+"""
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.authentication import CachedTokenAuthentication, token_cache
+
+from .utils import measure
+
+
+def run(iterations: int = 1000) -> dict:
+    """Return per request latency of every authentication class"""
+    user = get_user_model().objects.create_user(
+        email='bench-auth@example.com',
+        password='benchpass123'
+    )
+    token = Token.objects.create(user=user)
+    request = RequestFactory().get(
+        '/',
+        HTTP_AUTHORIZATION=f'Token {token.key}'
+    )
+
+    results = {}
+    for name, auth in [
+        ('TokenAuthentication', TokenAuthentication()),
+        ('CachedTokenAuthentication', CachedTokenAuthentication()),
+    ]:
+        token_cache.clear()
+        results[name] = measure(lambda: auth.authenticate(request), iterations)
+
+    return results
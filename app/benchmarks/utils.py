@@ -0,0 +1,51 @@
+"""
+Helpers shared by benchmarks
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@contextmanager
+def test_database():
+    """Run benchmarks against a throwaway test database"""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def summarize(samples: list[float], queries: int = 0) -> dict:
+    """Return latency percentiles in milliseconds for timing samples"""
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    total = sum(samples)
+
+    return {
+        'iterations': len(samples),
+        'mean_ms': round(total / len(samples) * 1000, 4),
+        'p50_ms': round(cuts[49] * 1000, 4),
+        'p95_ms': round(cuts[94] * 1000, 4),
+        'p99_ms': round(cuts[98] * 1000, 4),
+        'rps': round(len(samples) / total, 1),
+        'queries': round(queries / len(samples), 2),
+    }
+
+
+def measure(func, iterations: int, warmup: int = 10) -> dict:
+    """Call func repeatedly and return its latency and query count"""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+
+    return summarize(samples, len(queries))
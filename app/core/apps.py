@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        """Connect signal receivers"""
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .performance import install_query_recorder
+
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,135 @@
+"""
+Authentication classes for the API
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.authentication import TokenAuthentication
+
+
+class TTLCache:
+    """Thread safe in process LRU cache with a time to live for entries"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the value for key or None if it is missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Stores the value evicting the least recently used entries"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Removes key from the cache"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Removes all entries"""
+        with self._lock:
+            self._data.clear()
+
+
+token_cache = TTLCache(
+    max_size=settings.TOKEN_AUTH_CACHE['MAX_SIZE'],
+    ttl=settings.TOKEN_AUTH_CACHE['LOCAL_TTL']
+)
+
+
+def _shared_cache():
+    """Returns the shared Django cache or None if it is not configured"""
+    alias = settings.TOKEN_AUTH_CACHE['CACHE_ALIAS']
+    return caches[alias] if alias else None
+
+
+def _cache_key(key: str) -> str:
+    """Returns a cache key that does not expose the token itself"""
+    return 'token-auth:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_cached_token(key: str):
+    """Returns the cached token with its user or None"""
+    cache_key = _cache_key(key)
+    token = token_cache.get(cache_key)
+
+    shared_cache = _shared_cache()
+    if token is None and shared_cache is not None:
+        token = shared_cache.get(cache_key)
+        if token is not None:
+            token_cache.set(cache_key, token)
+
+    return token
+
+
+def cache_token(token):
+    """Stores the token with its user in the caches"""
+    cache_key = _cache_key(token.key)
+    token_cache.set(cache_key, token)
+
+    shared_cache = _shared_cache()
+    if shared_cache is not None:
+        shared_cache.set(
+            cache_key,
+            token,
+            timeout=settings.TOKEN_AUTH_CACHE['TTL']
+        )
+
+
+def invalidate_token(key: str):
+    """Removes the token from the caches"""
+    cache_key = _cache_key(key)
+    token_cache.delete(cache_key)
+
+    shared_cache = _shared_cache()
+    if shared_cache is not None:
+        shared_cache.delete(cache_key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches token lookups
+
+    Tokens are kept in an in process LRU and, when TOKEN_AUTH_CACHE sets
+    CACHE_ALIAS, in a shared Django cache. Signals in core.signals drop
+    entries when a token is deleted or its user changes, other processes
+    only see that after LOCAL_TTL, so keep it short.
+    """
+
+    def authenticate_credentials(self, key):
+        """Returns the user and token for key, from cache when possible"""
+        token = get_cached_token(key)
+
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache_token(token)
+
+        # Requests may change their user, so they never share the cached one
+        token = copy.deepcopy(token)
+        return token.user, token
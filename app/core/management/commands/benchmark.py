@@ -0,0 +1,91 @@
+"""
+Django command to run performance benchmarks on a test database
+"""
+import inspect
+import json
+import platform
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import BENCHMARKS
+from benchmarks.utils import test_database
+
+
+class Command(BaseCommand):
+    """Django command to run benchmarks"""
+
+    def add_arguments(self, parser):
+        """Add arguments for the command"""
+        parser.add_argument(
+            'benchmarks',
+            nargs='*',
+            help=f'Benchmarks to run, one of {", ".join(sorted(BENCHMARKS))}. '
+                 'Default is all of them.'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=1000,
+            help='Number of measured calls per case. Default is 1000.'
+        )
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            help='Recipes per seeded user for benchmarks seeding data. '
+                 'Default is the benchmark\'s own sizes.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Save the results as JSON to this file, to compare them '
+                 'between commits.'
+        )
+
+    def _run(self, name: str, options: dict) -> dict:
+        """Run a benchmark with the options it accepts"""
+        run = BENCHMARKS[name]
+        kwargs = {'iterations': options['iterations']}
+        if (
+            options['sizes']
+            and 'sizes' in inspect.signature(run).parameters
+        ):
+            kwargs['sizes'] = tuple(options['sizes'])
+
+        return run(**kwargs)
+
+    def handle(self, *args, **options):
+        """Entrypoint for the command"""
+        names = options['benchmarks'] or sorted(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(
+                f'Unknown benchmarks: {", ".join(sorted(unknown))}'
+            )
+
+        report = {}
+        with test_database():
+            for name in names:
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                results = report[name] = self._run(name, options)
+
+                for case, stats in results.items():
+                    self.stdout.write(
+                        f'  {case:<32} p50 {stats["p50_ms"]:>9.3f} ms'
+                        f'  p95 {stats["p95_ms"]:>9.3f} ms'
+                        f'  p99 {stats["p99_ms"]:>9.3f} ms'
+                        f'  {stats["rps"]:>10.1f} req/s'
+                        f'  {stats["queries"]:>6.2f} queries'
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'iterations': options['iterations'],
+                    'results': report,
+                }, file, indent=2)
+            self.stdout.write(f'Results saved to {options["output"]}')
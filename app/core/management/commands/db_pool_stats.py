@@ -0,0 +1,67 @@
+"""
+Django command to report database connection statistics
+"""
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    """
+    Django command to report database connection statistics
+
+    Lists the connections of every worker from pg_stat_activity. The pool
+    of this process is not the one of any worker, the pool statistics of
+    each worker are served at its /metrics instead.
+    """
+
+    def add_arguments(self, parser):
+        """Add arguments for the command"""
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias to report on. Default is "default".'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the statistics as JSON.'
+        )
+
+    def get_stats(self, alias: str) -> dict:
+        """Return settings and server side statistics for alias"""
+        connection = connections[alias]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT coalesce(state, \'unknown\'), count(*) '
+                'FROM pg_stat_activity '
+                'WHERE datname = current_database() '
+                'GROUP BY 1 ORDER BY 1'
+            )
+            server = dict(cursor.fetchall())
+
+        settings_dict = connection.settings_dict
+        return {
+            'database': alias,
+            'conn_max_age': settings_dict['CONN_MAX_AGE'],
+            'conn_health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+            'server_connections': server,
+        }
+
+    def handle(self, *args, **options):
+        """Entrypoint for the command"""
+        stats = self.get_stats(options['database'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2))
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING(stats['database']))
+        for name in ('conn_max_age', 'conn_health_checks'):
+            self.stdout.write(f'  {name:<20} {stats[name]}')
+
+        self.stdout.write('  server connections')
+        for state, count in stats['server_connections'].items():
+            self.stdout.write(f'    {state:<26} {count}')
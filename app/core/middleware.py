@@ -0,0 +1,157 @@
+"""
+Middleware for the API
+"""
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+
+from rest_framework.permissions import SAFE_METHODS
+
+from . import performance
+from .routers import mark_written, request_reads
+
+
+logger = logging.getLogger('core.performance')
+
+
+class ReadYourWritesMiddleware:
+    """
+    Reads from the primary during writes and marks users that wrote
+
+    The reads of other requests all go to one replica. Marked users keep
+    reading from the primary for READ_YOUR_WRITES_SECONDS through
+    core.routers.ReadYourWritesMixin, the marker lives in the cache, which
+    has to be shared for it to work across processes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        is_write = request.method not in SAFE_METHODS
+        with request_reads(use_primary=is_write):
+            response = self.get_response(request)
+
+        self._mark_writer(request, is_write)
+        return response
+
+    async def __acall__(self, request):
+        is_write = request.method not in SAFE_METHODS
+        with request_reads(use_primary=is_write):
+            response = await self.get_response(request)
+
+        self._mark_writer(request, is_write)
+        return response
+
+    def _mark_writer(self, request, is_write: bool):
+        """Marks the authenticated user of a write"""
+        user = getattr(request, 'user', None)
+        if is_write and user is not None and user.is_authenticated:
+            mark_written(user.pk)
+
+
+class PerformanceMiddleware:
+    """
+    Records where the time of each request goes
+
+    Reports the database time and query count, the view time, which
+    includes serializing the data, the time rendering the response and the
+    total time. They are sent as a Server-Timing header, logged as JSON to
+    the core.performance logger and, with PERFORMANCE_METRICS, added to the
+    histograms of routes in PERFORMANCE_METRICS_NAMESPACES served at
+    /metrics. Put it first in MIDDLEWARE so the total covers the others.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings, token = performance.start_request()
+        request.timings = timings
+        try:
+            response = self.get_response(request)
+        finally:
+            performance.end_request(token)
+
+        return self._report(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = performance.start_request()
+        request.timings = timings
+        try:
+            response = await self.get_response(request)
+        finally:
+            performance.end_request(token)
+
+        return self._report(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timings.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timings = request.timings
+        timings.render_start = time.perf_counter()
+
+        def rendered(response):
+            timings.render = time.perf_counter() - timings.render_start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def _report(self, request, response, timings):
+        """Adds the timings to the response, the log and the metrics"""
+        end = time.perf_counter()
+        total = end - timings.start
+        view = 0.0
+        if timings.view_start is not None:
+            view = (timings.render_start or end) - timings.view_start
+
+        response['Server-Timing'] = (
+            f'db;dur={timings.db * 1000:.2f};'
+            f'desc="{timings.queries} queries", '
+            f'view;dur={view * 1000:.2f}, '
+            f'render;dur={timings.render * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}'
+        )
+
+        match = request.resolver_match
+        route = match.view_name if match else None
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'route': route,
+                'status': response.status_code,
+                'queries': timings.queries,
+                'db_ms': round(timings.db * 1000, 2),
+                'view_ms': round(view * 1000, 2),
+                'render_ms': round(timings.render * 1000, 2),
+                'total_ms': round(total * 1000, 2),
+            }))
+
+        if (
+            settings.PERFORMANCE_METRICS
+            and match
+            and match.namespace in settings.PERFORMANCE_METRICS_NAMESPACES
+        ):
+            performance.observe(route, request.method, total, timings)
+
+        return response
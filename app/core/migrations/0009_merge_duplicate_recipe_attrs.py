@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge tags and ingredients sharing a name into the oldest one"""
+    Recipe = apps.get_model('core', 'Recipe')
+
+    for model_name, field_name in [('Tag', 'tags'), ('Ingredient', 'ingredients')]:
+        Model = apps.get_model('core', model_name)
+        Through = getattr(Recipe, field_name).through
+        column = f'{model_name.lower()}_id'
+
+        duplicates = (
+            Model.objects.values('user_id', 'name')
+            .annotate(keep_id=Min('id'), count=Count('id'))
+            .filter(count__gt=1)
+        )
+        for duplicate in duplicates:
+            keep_id = duplicate['keep_id']
+            other_ids = list(Model.objects.filter(
+                user_id=duplicate['user_id'],
+                name=duplicate['name']
+            ).exclude(id=keep_id).values_list('id', flat=True))
+
+            for other_id in other_ids:
+                linked = Through.objects.filter(**{column: keep_id}).values('recipe_id')
+                Through.objects.filter(**{column: other_id}).exclude(
+                    recipe_id__in=linked
+                ).update(**{column: keep_id})
+
+            Model.objects.filter(id__in=other_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-17 04:44
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Same vector as core.models.recipe_search_vector
+        migrations.RunSQL(
+            sql="""
+                UPDATE core_recipe r SET search_vector =
+                    setweight(to_tsvector('english', r.title), 'A')
+                    || setweight(to_tsvector('english', concat_ws(' ',
+                        (SELECT string_agg(t.name, ' ') FROM core_tag t
+                         JOIN core_recipe_tags rt ON rt.tag_id = t.id
+                         WHERE rt.recipe_id = r.id),
+                        (SELECT string_agg(i.name, ' ') FROM core_ingredient i
+                         JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+                         WHERE ri.recipe_id = r.id)
+                    )), 'B')
+                    || setweight(to_tsvector('english', r.description), 'C');
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.6 on 2026-10-17 05:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_recipe_attr_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='sync_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('version', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'version'], name='change_user_version_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'kind', 'object_id'), name='unique_change_user_object')],
+            },
+        ),
+        # Versions existing objects, tags and ingredients before the recipes
+        # linking them, so a first sync returns all of them
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO core_change (user_id, kind, object_id, version, deleted)
+                SELECT user_id, kind, id, ROW_NUMBER() OVER (
+                    PARTITION BY user_id ORDER BY position, id
+                ), false
+                FROM (
+                    SELECT user_id, 'tag' AS kind, id, 1 AS position FROM core_tag
+                    UNION ALL
+                    SELECT user_id, 'ingredient', id, 2 FROM core_ingredient
+                    UNION ALL
+                    SELECT user_id, 'recipe', id, 3 FROM core_recipe
+                ) objects;
+
+                UPDATE core_user u SET sync_version = c.version
+                FROM (
+                    SELECT user_id, MAX(version) AS version
+                    FROM core_change GROUP BY user_id
+                ) c
+                WHERE c.user_id = u.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
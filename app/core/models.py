@@ -2,7 +2,20 @@ import uuid
 import os
 
 from django.db import models
-from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
+from django.db.models.functions import Cast, Upper
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
+from django.contrib.auth.models import (
+    AbstractBaseUser,
+    PermissionsMixin,
+    BaseUserManager
+)
 from django.core.validators import validate_email
 from django.conf import settings
 
@@ -17,7 +30,9 @@ def recipe_image_file_path(instance, filename):
 
 class UserManager(BaseUserManager):
     """Manager for custom UserProfile class"""
-    def create_user(self, email: str, password: str = None, **extra_fields) -> 'User':
+    def create_user(
+        self, email: str, password: str = None, **extra_fields
+    ) -> 'User':
         """Creates a new user and returns it"""
         validate_email(email)
 
@@ -29,7 +44,9 @@ class UserManager(BaseUserManager):
 
         return user
 
-    def create_superuser(self, email: str, password: str, **extra_fields) -> 'User':
+    def create_superuser(
+        self, email: str, password: str, **extra_fields
+    ) -> 'User':
         """Creates a superuser and returns it"""
         user = self.create_user(email=email, password=password, **extra_fields)
 
@@ -41,12 +58,95 @@ class UserManager(BaseUserManager):
         return user
 
 
+class RecipeAttrManager(models.Manager):
+    """Manager for recipe attributes identified by name"""
+    def get_or_create_many(self, user, names: list[str]) -> list:
+        """Returns objects for names, creating missing ones in one insert"""
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+
+        found = {
+            obj.name: obj for obj in self.filter(user=user, name__in=names)
+        }
+        missing = [name for name in names if name not in found]
+
+        if missing:
+            from .sync import record_changes
+
+            # Conflicts come from concurrent creates of the same names,
+            # the rows are there either way so we just read them back
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in missing],
+                ignore_conflicts=True
+            )
+            created = list(self.filter(user=user, name__in=missing))
+            found.update((obj.name, obj) for obj in created)
+            # Bulk inserts send no signals
+            record_changes(self.model, user.pk, [obj.pk for obj in created])
+
+        return [found[name] for name in names]
+
+
+# Text search configuration of Recipe.search_vector and its queries
+SEARCH_CONFIG = 'english'
+
+
+def _names_subquery(model) -> models.Subquery:
+    """Returns the space separated names of model linked to a recipe"""
+    return models.Subquery(
+        model.objects.filter(recipe=models.OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+
+
+def recipe_search_vector() -> SearchVector:
+    """Returns the weighted search vector of a recipe"""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(
+            _names_subquery(Tag),
+            _names_subquery(Ingredient),
+            weight='B',
+            config=SEARCH_CONFIG
+        )
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Queryset for recipes with full text search"""
+    def update_search_vector(self, **fields) -> int:
+        """Recomputes the stored search vectors, updating fields as well"""
+        return self.update(search_vector=recipe_search_vector(), **fields)
+
+    def search(self, text: str) -> 'RecipeQuerySet':
+        """Returns recipes matching text annotated with their rank"""
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type='websearch'
+        )
+
+        # ts_rank returns a real, as double precision it round trips exactly
+        # through Python floats and the keyset pagination cursors
+        return self.filter(search_vector=query).annotate(
+            rank=Cast(
+                SearchRank(models.F('search_vector'), query),
+                models.FloatField()
+            )
+        )
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     """Custom User model"""
     email = models.EmailField(max_length=255, unique=True)
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Last version of the recipes, tags and ingredients, see core.sync
+    sync_version = models.BigIntegerField(default=0, editable=False)
 
     objects = UserManager()
 
@@ -71,6 +171,26 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Storage names of resized copies of image, see recipe.renditions
+    image_renditions = models.JSONField(default=dict, blank=True)
+    # Also bumped by core.signals when links or linked tags and ingredients
+    # change
+    updated_at = models.DateTimeField(auto_now=True)
+    # Title, tag and ingredient names and description, kept by core.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'], name='recipe_user_id_desc_idx'
+            ),
+            models.Index(
+                fields=['user', 'updated_at'], name='recipe_user_updated_idx'
+            ),
+            GinIndex(fields=['search_vector'], name='recipe_search_vector_idx')
+        ]
 
     def __str__(self) -> str:
         """Return string representation of recipe"""
@@ -84,6 +204,29 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecipeAttrManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_tag_user_name'
+            )
+        ]
+        indexes = [
+            # Serves keyset pages ordered by name, the id breaks ties
+            models.Index(
+                fields=['user', '-name', '-id'],
+                name='tag_user_name_id_idx'
+            ),
+            # Serves prefix and fuzzy autocomplete on the name
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='tag_name_trgm_idx'
+            )
+        ]
 
     def __str__(self):
         """Returns a string representation of the tag"""
@@ -97,7 +240,70 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecipeAttrManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_user_name'
+            )
+        ]
+        indexes = [
+            # Serves keyset pages ordered by name, the id breaks ties
+            models.Index(
+                fields=['user', '-name', '-id'],
+                name='ingredient_user_name_id_idx'
+            ),
+            # Serves prefix and fuzzy autocomplete on the name
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='ingredient_name_trgm_idx'
+            )
+        ]
 
     def __str__(self):
         """Returns a string represintation of the ingredient"""
         return self.name
+
+
+class Change(models.Model):
+    """
+    Last change of a recipe, tag or ingredient, read by syncing clients
+
+    Every object has a single row, which becomes its tombstone once it is
+    deleted. Link changes are recorded as changes of their recipes.
+    """
+    class Kind(models.TextChoices):
+        RECIPE = 'recipe'
+        TAG = 'tag'
+        INGREDIENT = 'ingredient'
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=16, choices=Kind)
+    object_id = models.BigIntegerField()
+    # Taken from User.sync_version, unique per user
+    version = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'kind', 'object_id'],
+                name='unique_change_user_object'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'version'], name='change_user_version_idx'
+            )
+        ]
+
+    def __str__(self):
+        """Returns a string representation of the change"""
+        return f'{self.kind} {self.object_id} @{self.version}'
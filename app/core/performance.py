@@ -0,0 +1,192 @@
+"""
+Per request timings and Prometheus style metrics
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from django.db import connections
+
+
+# Timings of the request being handled, copied into the threads running the
+# sync code of async requests, so their queries are recorded too
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Time spent by a request in the database, its view and rendering"""
+    __slots__ = (
+        'start', 'queries', 'db', 'view_start', 'render_start', 'render'
+    )
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.view_start = None
+        self.render_start = None
+        self.render = 0.0
+
+
+def start_request() -> tuple[RequestTimings, object]:
+    """Starts recording a request, returns its timings and a reset token"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    """Stops recording the request"""
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding queries to the current request"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - start
+        timings.queries += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver recording queries of the connection"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    """Prometheus style histogram with a series per label values"""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str],
+                 buckets: tuple[float]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        """Adds value to the series of label_values"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Bucket counts, then the +Inf count and the sum
+                series = self._series[label_values] = (
+                    [0] * (len(self.buckets) + 1) + [0.0]
+                )
+            series[index] += 1
+            series[-1] += value
+
+    def clear(self):
+        """Drops every series"""
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> list[str]:
+        """Returns the lines of the text exposition format"""
+        lines = [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = {key: list(value) for key, value in self._series.items()}
+
+        for label_values, counts in sorted(series.items()):
+            labels = ','.join(
+                f'{label}="{value}"'
+                for label, value in zip(self.labels, label_values)
+            )
+            total = 0
+            for bound, count in zip(
+                [*map(str, self.buckets), '+Inf'], counts[:-1]
+            ):
+                total += count
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="{bound}"}} {total}'
+                )
+            lines.append(f'{self.name}_sum{{{labels}}} {counts[-1]}')
+            lines.append(f'{self.name}_count{{{labels}}} {total}')
+
+        return lines
+
+
+LABELS = ('route', 'method')
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds',
+    'Time spent handling requests.',
+    LABELS,
+    SECONDS_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    'http_request_db_duration_seconds',
+    'Time requests spent running database queries.',
+    LABELS,
+    SECONDS_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Database queries run per request.',
+    LABELS,
+    (1, 2, 5, 10, 20, 50, 100),
+)
+HISTOGRAMS = (REQUEST_SECONDS, DB_SECONDS, DB_QUERIES)
+
+
+def observe(route: str, method: str, total: float, timings: RequestTimings):
+    """Adds a request to the histograms"""
+    REQUEST_SECONDS.observe(total, route, method)
+    DB_SECONDS.observe(timings.db, route, method)
+    DB_QUERIES.observe(timings.queries, route, method)
+
+
+# Statistics of psycopg_pool.ConnectionPool.get_stats() that go up and down,
+# the others count from the start of the pool
+POOL_GAUGES = (
+    'pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting'
+)
+
+
+def render_pool_stats() -> list[str]:
+    """
+    Returns the statistics of the connection pools of this process
+
+    Only pools already created by the process are reported, each worker has
+    its own, so they have to be read from inside the worker.
+    """
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], '_connection_pools', {}).get(alias)
+        if pool is not None:
+            stats[alias] = pool.get_stats()
+
+    names = sorted({name for values in stats.values() for name in values})
+    lines = []
+    for name in names:
+        kind = 'gauge' if name in POOL_GAUGES else 'counter'
+        lines.append(f'# HELP db_{name} {name} of the connection pool.')
+        lines.append(f'# TYPE db_{name} {kind}')
+        lines.extend(
+            f'db_{name}{{database="{alias}"}} {values[name]}'
+            for alias, values in sorted(stats.items())
+            if name in values
+        )
+
+    return lines
+
+
+def render_metrics() -> str:
+    """Returns the metrics of this process in the text exposition format"""
+    lines = [line for histogram in HISTOGRAMS for line in histogram.render()]
+    return '\n'.join(lines + render_pool_stats()) + '\n'
@@ -0,0 +1,138 @@
+"""
+Database routing between the primary and its read replicas
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class _Reads:
+    """Database the reads of a request go to, chosen at its first read"""
+
+    def __init__(self, alias: str | None = None):
+        self.alias = alias
+
+
+# Reads of the current request or block, each read outside of them picks a
+# replica. Shared by reference, so a choice made in a thread of sync_to_async
+# holds for the rest of the request
+_reads = ContextVar('reads', default=None)
+
+
+def pin_to_primary():
+    """Sends the following reads of the current context to the primary"""
+    reads = _reads.get()
+    if reads is None:
+        _reads.set(_Reads(DEFAULT_DB_ALIAS))
+    else:
+        reads.alias = DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def primary(enabled: bool = True):
+    """Sends reads inside the block to the primary while enabled"""
+    if not enabled:
+        yield
+        return
+
+    token = _reads.set(_Reads(DEFAULT_DB_ALIAS))
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+@contextmanager
+def request_reads(use_primary: bool = False):
+    """
+    Sends every read inside the block to the same database
+
+    A request reading from one replica sees a single, advancing state, so
+    e.g. its ETag and its body are read from the same data.
+    """
+    token = _reads.set(_Reads(DEFAULT_DB_ALIAS if use_primary else None))
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+def _written_key(user_id: int) -> str:
+    """Returns the cache key marking a user that recently wrote"""
+    return f'db:recent-write:{user_id}'
+
+
+def mark_written(user_id: int):
+    """Keeps the user on the primary until replicas caught up"""
+    cache.set(
+        _written_key(user_id), True, timeout=settings.READ_YOUR_WRITES_SECONDS
+    )
+
+
+def recently_written(user_id: int) -> bool:
+    """Returns whether the user wrote within READ_YOUR_WRITES_SECONDS"""
+    return cache.get(_written_key(user_id), False)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a random replica of REPLICA_DATABASES and writes to the
+    primary
+
+    Reads stay on the primary while pinned, inside a transaction on the
+    primary, so reads see the transaction's own writes, and when no
+    replica is configured. Inside request_reads() the replica of the first
+    read serves the others, related objects are read where their instance
+    was read from.
+    """
+
+    def db_for_read(self, model, **hints):
+        """Returns a replica unless the read has to see recent writes"""
+        replicas = settings.REPLICA_DATABASES
+        reads = _reads.get()
+        instance = hints.get('instance')
+
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if (
+            not replicas
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        if reads is None:
+            return random.choice(replicas)
+        if reads.alias is None:
+            reads.alias = random.choice(replicas)
+
+        return reads.alias
+
+    def db_for_write(self, model, **hints):
+        """Returns the primary"""
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allows relations, replicas hold the same rows as the primary"""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Migrates the primary only, replicas follow through replication"""
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReadYourWritesMixin:
+    """
+    Viewset mixin reading from the primary for users that recently wrote
+
+    Runs after authentication, which the middleware runs too early for
+    with token authenticated API requests.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if request.user.is_authenticated and recently_written(request.user.pk):
+            pin_to_primary()
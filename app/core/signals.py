@@ -0,0 +1,128 @@
+"""
+Signal receivers for core models
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token
+from .models import Recipe, Tag, Ingredient
+from .sync import record_changes
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Drop deleted tokens from the authentication cache"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """Drop tokens of changed users so they are not served stale"""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+def touch_recipes(queryset):
+    """Mark recipes as updated and refresh their search vectors"""
+    queryset.update_search_vector(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(
+    sender, instance, update_fields=None, **kwargs
+):
+    """Refresh the search vector of saved recipes"""
+    if (
+        update_fields is not None
+        and not {'title', 'description'} & set(update_fields)
+    ):
+        return
+
+    Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes_on_links(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Mark recipes as updated when their tags or ingredients change"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+            record_changes(Recipe, instance.user_id, [instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+        record_changes(Recipe, instance.user_id, pk_set)
+    elif action == 'pre_clear':
+        recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+        touch_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+        record_changes(Recipe, instance.user_id, recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_on_attr_change(sender, instance, created, **kwargs):
+    """Mark recipes as updated when a linked tag or ingredient changes"""
+    if not created:
+        touch_recipes(instance.recipe_set.all())
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_attr_recipes(sender, instance, **kwargs):
+    """Remember the recipes of a tag or ingredient that is being deleted"""
+    instance.linked_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def touch_recipes_on_attr_delete(sender, instance, origin=None, **kwargs):
+    """Mark recipes as updated once a linked tag or ingredient is gone"""
+    if instance.linked_recipe_ids:
+        touch_recipes(Recipe.objects.filter(pk__in=instance.linked_recipe_ids))
+        if not deleted_with_user(origin):
+            record_changes(
+                Recipe, instance.user_id, instance.linked_recipe_ids
+            )
+
+
+def deleted_with_user(origin) -> bool:
+    """Returns whether a deletion cascades from deleting its user"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, get_user_model())
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def record_saved_change(sender, instance, **kwargs):
+    """Add saved recipes, tags and ingredients to the change log"""
+    record_changes(sender, instance.user_id, [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def record_deleted_change(sender, instance, origin=None, **kwargs):
+    """Leave tombstones of deleted recipes, tags and ingredients"""
+    # The change log of the user is deleted with it
+    if not deleted_with_user(origin):
+        record_changes(sender, instance.user_id, [instance.pk], deleted=True)
@@ -0,0 +1,76 @@
+"""
+Change log of recipes, tags and ingredients for syncing clients
+
+Every change takes the next versions from User.sync_version and stores them
+in the Change row of the object. The counter row stays locked until the
+change commits, so the changes of a user commit in version order and a
+client that read up to a version never misses a change below it.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from .models import Change
+
+
+def _record_sql() -> str:
+    """Returns the statement taking versions and upserting Change rows"""
+    user_table = get_user_model()._meta.db_table
+    change_table = Change._meta.db_table
+
+    return f'''
+        WITH counter AS (
+            UPDATE {user_table}
+            SET sync_version = sync_version + %(count)s
+            WHERE id = %(user_id)s
+            RETURNING sync_version
+        )
+        INSERT INTO {change_table} (user_id, kind, object_id, version, deleted)
+        SELECT
+            %(user_id)s, %(kind)s, changed.object_id,
+            counter.sync_version - %(count)s + changed.position, %(deleted)s
+        FROM counter, UNNEST(%(ids)s::bigint[])
+            WITH ORDINALITY AS changed(object_id, position)
+        ON CONFLICT (user_id, kind, object_id) DO UPDATE
+        SET version = EXCLUDED.version, deleted = EXCLUDED.deleted
+    '''
+
+
+def record_changes(model, user_id: int, ids: list[int], deleted=False):
+    """Records changes of objects of model with one query"""
+    # A row can only be upserted once per statement
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(_record_sql(), {
+            'count': len(ids),
+            'user_id': user_id,
+            'kind': model._meta.model_name,
+            'ids': ids,
+            'deleted': deleted,
+        })
+
+
+def changes_since(
+    user_id: int, version: int, limit: int
+) -> tuple[dict[str, dict[str, list[int]]], int, bool]:
+    """
+    Returns the changed and deleted ids of every kind after version
+
+    Also returns the version to continue from and whether more changes
+    are left after the limit.
+    """
+    rows = list(
+        Change.objects.filter(user_id=user_id, version__gt=version)
+        .order_by('version')
+        .values_list('kind', 'object_id', 'deleted', 'version')[:limit + 1]
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    changes = {kind: {'changed': [], 'deleted': []} for kind in Change.Kind}
+    for kind, object_id, deleted, _version in rows:
+        changes[kind]['deleted' if deleted else 'changed'].append(object_id)
+
+    return changes, rows[-1][3] if rows else version, more
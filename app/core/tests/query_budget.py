@@ -0,0 +1,149 @@
+"""
+Query count and wall time budgets for API routes
+
+Budgets are checked in as JSON next to the tests using them. Run the tests
+with QUERY_BUDGETS_UPDATE=1 to rewrite the budgets of the tests that ran
+from their measurements instead of checking them.
+"""
+import json
+import math
+import os
+import statistics
+import time
+from pathlib import Path
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+
+
+UPDATE_ENV = 'QUERY_BUDGETS_UPDATE'
+# Recorded wall times are multiplied by the margin and rounded up to the
+# floor, so slower machines and CI runners stay within budget. Query counts
+# catch small regressions, wall times only have to catch big ones
+WALL_TIME_MARGIN = 3
+WALL_TIME_FLOOR_MS = 50
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _url_names(resolver: URLResolver) -> set[str]:
+    """Returns the names of the URL patterns below resolver"""
+    names = set()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            names |= _url_names(pattern)
+        elif pattern.name:
+            names.add(pattern.name)
+
+    return names
+
+
+class QueryBudgetMixin:
+    """
+    Test case mixin checking requests against budgets in budget_file
+
+    Every named route of budget_namespaces needs a budget, which is keyed
+    by the method, the namespaced URL name and an optional label.
+    """
+    budget_file: Path = None
+    budget_namespaces: tuple[str] = ()
+    # Safe requests are repeated, their slowest run sets the query count,
+    # so cold caches count, and their median run sets the wall time
+    budget_repeats = 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.update_budgets = os.environ.get(UPDATE_ENV) == '1'
+        cls.budgets = cls._load_budgets()
+        cls.measured = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.update_budgets and cls.measured:
+            budgets = cls._load_budgets()
+            budgets.update(cls.measured)
+            cls.budget_file.write_text(
+                json.dumps(budgets, indent=2, sort_keys=True) + '\n'
+            )
+        super().tearDownClass()
+
+    @classmethod
+    def _load_budgets(cls) -> dict:
+        """Returns the checked in budgets"""
+        if not cls.budget_file.exists():
+            return {}
+
+        return json.loads(cls.budget_file.read_text())
+
+    def _request(self, method: str, url: str, data, **kwargs):
+        """Requests url, reading streamed content so its queries run"""
+        response = getattr(self.client, method.lower())(url, data, **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+        return response
+
+    def assertWithinBudget(
+        self, method: str, url_name: str, args=None, data=None,
+        label: str = None, status: int = 200, **kwargs
+    ):
+        """Request the named route and compare it against its budget"""
+        method = method.upper()
+        url = reverse(url_name, args=args)
+        key = f'{method} {url_name}' + (f' [{label}]' if label else '')
+        repeats = self.budget_repeats if method in SAFE_METHODS else 1
+
+        counts, times = [], []
+        for _ in range(repeats):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = self._request(method, url, data, **kwargs)
+                times.append((time.perf_counter() - start) * 1000)
+
+            self.assertEqual(response.status_code, status, key)
+            counts.append(len(queries))
+
+        measured = {
+            'queries': max(counts),
+            'wall_ms': statistics.median(times),
+        }
+        if self.update_budgets:
+            self.measured[key] = {
+                'queries': measured['queries'],
+                'wall_ms': math.ceil(max(
+                    measured['wall_ms'] * WALL_TIME_MARGIN,
+                    WALL_TIME_FLOOR_MS
+                )),
+            }
+            return response
+
+        budget = self.budgets.get(key)
+        if budget is None:
+            self.fail(f'No budget for {key}, run with {UPDATE_ENV}=1')
+
+        self.assertLessEqual(
+            measured['queries'], budget['queries'],
+            f'{key} ran {measured["queries"]} queries, its budget is '
+            f'{budget["queries"]}, run with {UPDATE_ENV}=1 if expected'
+        )
+        self.assertLessEqual(
+            measured['wall_ms'], budget['wall_ms'],
+            f'{key} took {measured["wall_ms"]:.1f} ms, its budget is '
+            f'{budget["wall_ms"]} ms'
+        )
+
+        return response
+
+    def test_routes_have_budgets(self):
+        """Test every named route of the namespaces has a budget"""
+        if self.update_budgets:
+            self.skipTest('Budgets are being updated')
+
+        resolver = get_resolver()
+        budgeted = {key.split()[1] for key in self.budgets}
+
+        for namespace in self.budget_namespaces:
+            _prefix, namespace_resolver = resolver.namespace_dict[namespace]
+            for name in _url_names(namespace_resolver):
+                self.assertIn(f'{namespace}:{name}', budgeted)
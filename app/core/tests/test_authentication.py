@@ -0,0 +1,125 @@
+"""
+Tests for cached token authentication
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    TTLCache,
+    token_cache,
+)
+
+
+class TTLCacheTests(TestCase):
+    """Test the in process LRU cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Oldest unused entries must be evicted over max size"""
+        lru = TTLCache(max_size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    @patch('core.authentication.time.monotonic')
+    def test_entries_expire(self, patched_monotonic):
+        """Entries must not be returned after their time to live"""
+        patched_monotonic.return_value = 100
+        lru = TTLCache(max_size=2, ttl=10)
+        lru.set('a', 1)
+
+        patched_monotonic.return_value = 111
+
+        self.assertIsNone(lru.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test caching token lookups"""
+
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@test.test',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_cached_lookup_skips_database(self):
+        """Second authentication with the same token must not query"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_cached_user_is_not_shared(self):
+        """Every authentication must get its own user instance"""
+        user1, _ = self.auth.authenticate_credentials(self.token.key)
+        user2, _ = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertIsNot(user1, user2)
+
+    def test_invalid_token(self):
+        """Unknown tokens must fail"""
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('invalid')
+
+    def test_deleted_token_invalidated(self):
+        """Deleted tokens must not authenticate from cache"""
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_deactivated_user_invalidated(self):
+        """Tokens of deactivated users must not authenticate from cache"""
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deleted_user_invalidated(self):
+        """Tokens of deleted users must not authenticate from cache"""
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    @override_settings(TOKEN_AUTH_CACHE={
+        'MAX_SIZE': 10, 'LOCAL_TTL': 30, 'TTL': 300, 'CACHE_ALIAS': 'default'
+    })
+    def test_shared_cache_lookup(self):
+        """Tokens cached by another process must be read from shared cache"""
+        self.auth.authenticate_credentials(self.token.key)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+
+        key = self.token.key
+        self.token.delete()
+        token_cache.clear()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
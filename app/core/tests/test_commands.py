@@ -2,13 +2,20 @@
 Tests custom managment commands
 """
 
-from unittest.mock import patch
+from io import StringIO
+import json
+import tempfile
+from unittest.mock import MagicMock, patch
 
 from psycopg import OperationalError as PsycopgOpError
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from benchmarks import api
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -51,3 +58,90 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(str(context.exception),
                          'Database unavaible after timeout')
+
+
+@patch('core.management.commands.benchmark.test_database')
+class BenchmarkCommandTests(SimpleTestCase):
+    """Test benchmark command"""
+
+    def test_benchmark_runs_selected(self, patched_test_database):
+        """Test running a selected benchmark prints its results"""
+        stats = {
+            'p50_ms': 1, 'p95_ms': 2, 'p99_ms': 3, 'rps': 4, 'queries': 1
+        }
+        run = MagicMock(return_value={'case': stats})
+        out = StringIO()
+
+        with patch.dict(
+            'core.management.commands.benchmark.BENCHMARKS',
+            {'sample': run}
+        ):
+            call_command('benchmark', 'sample', iterations=5, stdout=out)
+
+        run.assert_called_once_with(iterations=5)
+        patched_test_database.assert_called_once()
+        self.assertIn('case', out.getvalue())
+
+    def test_benchmark_unknown(self, patched_test_database):
+        """Test unknown benchmark names fail"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark', 'missing')
+
+    def test_benchmark_sizes_and_output(self, patched_test_database):
+        """Test sizes reach benchmarks taking them and results are saved"""
+        stats = {
+            'p50_ms': 1, 'p95_ms': 2, 'p99_ms': 3, 'rps': 4, 'queries': 1
+        }
+        sized = MagicMock(return_value={'case': stats})
+
+        def unsized(iterations):
+            return {'case': stats}
+
+        def sized_run(iterations, sizes=(1,)):
+            return sized(iterations=iterations, sizes=sizes)
+
+        with tempfile.NamedTemporaryFile(suffix='.json') as output, \
+                patch.dict(
+                    'core.management.commands.benchmark.BENCHMARKS',
+                    {'sized': sized_run, 'unsized': unsized}
+                ):
+            call_command(
+                'benchmark', 'sized', 'unsized',
+                iterations=5, sizes=[10, 20], output=output.name,
+                stdout=StringIO()
+            )
+            report = json.load(output)
+
+        sized.assert_called_once_with(iterations=5, sizes=(10, 20))
+        self.assertEqual(report['iterations'], 5)
+        self.assertEqual(report['results']['unsized'], {'case': stats})
+
+
+class ApiBenchmarkTests(TestCase):
+    """Test the API benchmark"""
+
+    def test_api_benchmark_runs(self):
+        """Test every endpoint is measured for every size"""
+        results = api.run(iterations=2, sizes=(3,))
+
+        self.assertIn('recipe list @3', results)
+        self.assertIn('user me @3', results)
+        self.assertEqual(results['recipe detail @3']['iterations'], 2)
+        self.assertGreater(results['recipe list @3']['queries'], 0)
+
+
+class DbPoolStatsCommandTests(TestCase):
+    """Test reporting database connection statistics"""
+
+    def test_db_pool_stats(self):
+        """Test connection settings and server connections are listed"""
+        out = StringIO()
+
+        call_command('db_pool_stats', '--json', stdout=out)
+
+        stats = json.loads(out.getvalue())
+        self.assertNotIn('pool', stats)
+        self.assertEqual(
+            stats['conn_max_age'], connection.settings_dict['CONN_MAX_AGE']
+        )
+        self.assertGreaterEqual(stats['server_connections']['active'], 1)
@@ -6,10 +6,13 @@ from decimal import Decimal
 
 from django.test import TestCase
 from django.core.exceptions import ValidationError
-# We could import model directly, but it is a better practice to import it like this
+from django.db import IntegrityError
+# We could import model directly, but it is a better practice to import it
+# like this
 from django.contrib.auth import get_user_model
 
 from core import models
+from core.sync import record_changes
 
 
 class UserModelTests(TestCase):
@@ -22,7 +25,9 @@ class UserModelTests(TestCase):
         email = 'test-req-fields@email.test'
         name = 'Test Name'
 
-        user = get_user_model().objects.create_user(email=email, password=password, name=name)
+        user = get_user_model().objects.create_user(
+            email=email, password=password, name=name
+        )
 
         self.assertEqual(user.name, name)
         self.assertTrue(user.check_password(password))
@@ -44,11 +49,15 @@ class UserModelTests(TestCase):
         Users email must be valid, if not it must raise an ValidationError
         """
         password = 'testPass123'
-        invalid_emails = ['', ' ', None, 'invalid_email.com', 'invalidEmail.com']
+        invalid_emails = [
+            '', ' ', None, 'invalid_email.com', 'invalidEmail.com'
+        ]
 
         for invalid_email in invalid_emails:
             with self.assertRaises(ValidationError):
-                get_user_model().objects.create_user(email=invalid_email, password=password)
+                get_user_model().objects.create_user(
+                    email=invalid_email, password=password
+                )
 
     def test_user_has_normalized_email(self):
         """
@@ -58,7 +67,9 @@ class UserModelTests(TestCase):
         normalized_email = 'test-normal@email.test'
         password = 'testPass123'
 
-        user = get_user_model().objects.create_user(email=email, password=password)
+        user = get_user_model().objects.create_user(
+            email=email, password=password
+        )
 
         self.assertEqual(user.email, normalized_email)
 
@@ -72,7 +83,9 @@ class UserModelTests(TestCase):
 
         get_user_model().objects.create_user(email=email, password=password)
         with self.assertRaises(Exception):
-            get_user_model().objects.create_user(email=email, password=password2)
+            get_user_model().objects.create_user(
+                email=email, password=password2
+            )
 
     def test_create_superuser_successfuly(self):
         """
@@ -82,7 +95,9 @@ class UserModelTests(TestCase):
         email = 'test-super@email.test'
         name = 'Test Name'
 
-        superuser = get_user_model().objects.create_superuser(email=email, password=password, name=name)
+        superuser = get_user_model().objects.create_superuser(
+            email=email, password=password, name=name
+        )
 
         self.assertEqual(superuser.name, name)
         self.assertTrue(superuser.check_password(password))
@@ -130,6 +145,35 @@ class TagModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name"""
+        user = get_user_model().objects.create_user(
+            email='user@test.test',
+            password='testpass123'
+        )
+        models.Tag.objects.create(user=user, name='Tag1')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Tag1')
+
+    def test_get_or_create_many_tags(self):
+        """Test getting existing tags and creating missing ones together"""
+        user = get_user_model().objects.create_user(
+            email='user@test.test',
+            password='testpass123'
+        )
+        existing = models.Tag.objects.create(user=user, name='Old')
+
+        tags = models.Tag.objects.get_or_create_many(
+            user, ['New', 'Old', 'New']
+        )
+
+        self.assertEqual([tag.name for tag in tags], ['New', 'Old'])
+        self.assertEqual(tags[1], existing)
+        self.assertIsNotNone(tags[0].pk)
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
+
+
 class IngredientModelTests(TestCase):
     def test_create_ingredient(self):
         """Test creating ingredient is successful"""
@@ -141,3 +185,34 @@ class IngredientModelTests(TestCase):
         ingredient = models.Ingredient.objects.create(user=user, name='Eggs')
 
         self.assertEqual(str(ingredient), ingredient.name)
+
+
+class ChangeModelTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@test.test',
+            password='testpass123'
+        )
+
+    def test_record_changes(self):
+        """Test every change takes the next version of the user"""
+        record_changes(models.Tag, self.user.pk, [7, 8, 7])
+        record_changes(models.Tag, self.user.pk, [8], deleted=True)
+
+        changes = models.Change.objects.filter(user=self.user)
+        self.assertEqual(
+            sorted(changes.values_list('object_id', 'version', 'deleted')),
+            [(7, 1, False), (8, 3, True)]
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.sync_version, 3)
+        self.assertEqual(str(changes.get(object_id=8)), 'tag 8 @3')
+
+    def test_get_or_create_many_records_changes(self):
+        """Test tags created in bulk are added to the change log"""
+        models.Tag.objects.get_or_create_many(self.user, ['New', 'Other'])
+
+        self.assertEqual(
+            models.Change.objects.filter(user=self.user, kind='tag').count(),
+            2
+        )
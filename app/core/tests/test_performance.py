@@ -0,0 +1,159 @@
+"""
+Tests for request timings and metrics
+"""
+import json
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import performance
+from core.middleware import PerformanceMiddleware
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+def server_timing(response) -> dict:
+    """Return the Server-Timing header as a dict of metrics"""
+    metrics = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+
+    return metrics
+
+
+class PerformanceMiddlewareTests(TestCase):
+    """Test recording request timings"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.test',
+            'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        for histogram in performance.HISTOGRAMS:
+            histogram.clear()
+
+    def test_server_timing_header(self):
+        """Test API responses report their timings"""
+        res = self.client.get(RECIPES_URL)
+
+        timing = server_timing(res)
+        self.assertEqual(set(timing), {'db', 'view', 'render', 'total'})
+        self.assertNotEqual(timing['db']['desc'], '"0 queries"')
+        self.assertGreater(float(timing['render']['dur']), 0)
+        self.assertGreaterEqual(
+            float(timing['total']['dur']), float(timing['view']['dur'])
+        )
+
+    def test_timings_logged_as_json(self):
+        """Test every request logs a JSON line with its timings"""
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            self.client.get(RECIPES_URL)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'recipe:recipe-list')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+
+    def test_metrics_disabled(self):
+        """Test metrics are not served unless enabled"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 404)
+
+    @override_settings(PERFORMANCE_METRICS=True)
+    def test_metrics_per_route(self):
+        """Test routes of the API namespaces are added to the histograms"""
+        self.client.get(RECIPES_URL)
+        self.client.get(reverse('api-schema'))
+
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='127.0.0.1')
+
+        content = res.content.decode()
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{route="recipe:recipe-list",method="GET"} 1',
+            content
+        )
+        self.assertIn('http_request_db_queries_bucket', content)
+        self.assertNotIn('api-schema', content)
+
+    @override_settings(PERFORMANCE_METRICS=True)
+    def test_metrics_only_local(self):
+        """Test metrics are hidden from other addresses"""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(res.status_code, 404)
+
+    async def test_async_requests_record_queries(self):
+        """Test queries of async requests run in threads are recorded"""
+        async def get_response(request):
+            await Recipe.objects.acount()
+            await Recipe.objects.acount()
+            return HttpResponse()
+
+        request = AsyncRequestFactory().get('/')
+        request.resolver_match = None
+
+        res = await PerformanceMiddleware(get_response)(request)
+
+        self.assertEqual(server_timing(res)['db']['desc'], '"2 queries"')
+
+
+class HistogramTests(SimpleTestCase):
+    """Test the histograms of the metrics endpoint"""
+
+    def test_render_histogram(self):
+        """Test buckets are cumulative and end with sum and count"""
+        histogram = performance.Histogram(
+            'sample', 'Sample values.', ('route',), (1, 5)
+        )
+        for value in (0.5, 2, 3, 10):
+            histogram.observe(value, 'home')
+
+        self.assertEqual(histogram.render(), [
+            '# HELP sample Sample values.',
+            '# TYPE sample histogram',
+            'sample_bucket{route="home",le="1"} 1',
+            'sample_bucket{route="home",le="5"} 3',
+            'sample_bucket{route="home",le="+Inf"} 4',
+            'sample_sum{route="home"} 15.5',
+            'sample_count{route="home"} 4',
+        ])
+
+    def test_render_pool_stats(self):
+        """Test statistics of the pools of the process are rendered"""
+        pool = MagicMock()
+        pool.get_stats.return_value = {'pool_size': 4, 'requests_num': 9}
+
+        with patch.dict(
+            type(connections['default'])._connection_pools, {'default': pool}
+        ):
+            lines = performance.render_pool_stats()
+
+        self.assertIn('# TYPE db_pool_size gauge', lines)
+        self.assertIn('db_pool_size{database="default"} 4', lines)
+        self.assertIn('# TYPE db_requests_num counter', lines)
+        self.assertIn('db_requests_num{database="default"} 9', lines)
+
+    def test_render_without_pools(self):
+        """Test processes without pools only render the histograms"""
+        self.assertEqual(performance.render_pool_stats(), [])
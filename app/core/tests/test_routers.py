@@ -0,0 +1,139 @@
+"""
+Tests for the read replica router
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import routers
+from core.middleware import ReadYourWritesMiddleware
+from core.models import Recipe
+
+
+@override_settings(REPLICA_DATABASES=['replica1', 'replica2'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test routing reads to replicas"""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_go_to_replicas(self):
+        """Test reads are spread over replicas and writes hit the primary"""
+        reads = {self.router.db_for_read(Recipe) for _ in range(50)}
+
+        self.assertEqual(reads, {'replica1', 'replica2'})
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    def test_pinned_reads_go_to_primary(self):
+        """Test reads inside a primary block use the primary"""
+        with routers.primary():
+            self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+        self.assertNotEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_request_reads_use_one_replica(self):
+        """Test every read of a request goes to the replica of the first"""
+        with routers.request_reads():
+            reads = {self.router.db_for_read(Recipe) for _ in range(50)}
+            routers.pin_to_primary()
+            pinned = self.router.db_for_read(Recipe)
+
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(pinned, 'default')
+        self.assertIsNone(routers._reads.get())
+
+    def test_related_reads_follow_instance(self):
+        """Test objects related to an instance are read where it was"""
+        recipe = Recipe()
+        recipe._state.db = 'replica2'
+
+        reads = {
+            self.router.db_for_read(Recipe, instance=recipe)
+            for _ in range(10)
+        }
+
+        self.assertEqual(reads, {'replica2'})
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_reads_without_replicas(self):
+        """Test reads use the primary when there are no replicas"""
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_only_primary_migrated(self):
+        """Test replicas are left to replication"""
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'core'))
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReadYourWritesTests(TestCase):
+    """Test users read from the primary after writing"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@test.test',
+            'testpass123'
+        )
+        self.factory = RequestFactory()
+
+    def test_transaction_reads_go_to_primary(self):
+        """Test reads inside a transaction on the primary stay there"""
+        router = routers.ReplicaRouter()
+
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def _call_middleware(self, request):
+        """Run the middleware, returning the database reads were routed to"""
+        routed = []
+
+        def get_response(request):
+            routed.append(routers._reads.get().alias)
+            return HttpResponse()
+
+        ReadYourWritesMiddleware(get_response)(request)
+        return routed[0]
+
+    def test_middleware_marks_writes(self):
+        """Test writes read from the primary and mark the user"""
+        request = self.factory.post('/')
+        request.user = self.user
+
+        self.assertEqual(self._call_middleware(request), 'default')
+        self.assertTrue(routers.recently_written(self.user.pk))
+        self.assertIsNone(routers._reads.get())
+
+    def test_middleware_ignores_reads(self):
+        """Test safe requests neither pin nor mark the user"""
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+
+        # The replica is chosen by the first read
+        self.assertIsNone(self._call_middleware(request))
+        self.assertFalse(routers.recently_written(self.user.pk))
+
+    @patch('core.routers.pin_to_primary')
+    def test_viewset_pins_recent_writers(self, patched_pin):
+        """Test API reads of users that just wrote are pinned to the primary"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('recipe:recipe-list')
+
+        client.get(url)
+        patched_pin.assert_not_called()
+
+        client.post(url, {'title': 'Soup', 'time_minutes': 5, 'price': '1.00'})
+        client.get(url)
+        patched_pin.assert_called_once()
@@ -0,0 +1,20 @@
+"""
+Views for the core app
+"""
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from .performance import render_metrics
+
+
+def metrics(request):
+    """Serve the request metrics of this process to local scrapers"""
+    if (
+        not settings.PERFORMANCE_METRICS
+        or request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS
+    ):
+        raise Http404
+
+    return HttpResponse(
+        render_metrics(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,74 @@
+"""
+Gunicorn configuration for serving the API in production
+
+SERVER_MODE=asgi, the default, runs the ASGI application in uvicorn
+workers with async recipe, tag and ingredient reads. SERVER_MODE=wsgi runs
+the WSGI application in threaded sync workers.
+"""
+import multiprocessing
+import os
+
+server_mode = os.environ.get('SERVER_MODE', 'asgi')
+
+if server_mode == 'asgi':
+    wsgi_app = 'app.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    os.environ.setdefault('ASYNC_READ_VIEWS', '1')
+    # Sync code of ASGI requests runs in short lived threads, so persistent
+    # connections would never be reused, pool them instead
+    os.environ.setdefault('DB_POOL', '1')
+elif server_mode == 'wsgi':
+    wsgi_app = 'app.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+else:
+    raise ValueError(f'Unknown SERVER_MODE {server_mode}, use asgi or wsgi')
+
+# Log the timings of every request as JSON lines
+os.environ.setdefault('PERFORMANCE_LOG_LEVEL', 'INFO')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(
+    os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+)
+
+# Every worker opens its own pool, so their sizes are shared out of the
+# connections the database server allows us, 80 by default to stay below
+# the max_connections=100 default of Postgres with room for other clients
+if os.environ.get('DB_POOL') == '1':
+    db_max_connections = int(os.environ.get('DB_MAX_CONNECTIONS', 80))
+    pool_max_size = int(os.environ.setdefault(
+        'DB_POOL_MAX_SIZE', str(max(db_max_connections // workers, 1))
+    ))
+    os.environ.setdefault('DB_POOL_MIN_SIZE', str(min(pool_max_size, 2)))
+
+    if pool_max_size * workers > db_max_connections:
+        raise ValueError(
+            f'{workers} workers with pools of DB_POOL_MAX_SIZE='
+            f'{pool_max_size} connections exceed DB_MAX_CONNECTIONS='
+            f'{db_max_connections}, lower them or raise DB_MAX_CONNECTIONS'
+        )
+
+# Tag and ingredient list caches, their versions and the read your writes
+# markers must be seen by every worker, caches inside a process are not
+process_cache_backends = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+cache_backend = os.environ.get('CACHE_BACKEND', process_cache_backends[0])
+if workers > 1 and cache_backend in process_cache_backends:
+    raise ValueError(
+        f'{workers} workers can not share {cache_backend}, set '
+        'CACHE_BACKEND and CACHE_LOCATION to a shared cache, e.g. '
+        'django.core.cache.backends.redis.RedisCache, or WEB_CONCURRENCY=1'
+    )
+
+# Seconds idle client connections are kept open, keep it above the idle
+# timeout of the load balancer in front of the app
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 75))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+accesslog = '-'
@@ -0,0 +1,105 @@
+"""
+Async request handling for the read actions of the recipe APIs
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+
+# Chunks of a sync stream read per thread switch under ASGI
+STREAM_BATCH_SIZE = 100
+
+
+def stream_content(request, content):
+    """
+    Returns content for a StreamingHttpResponse answering request
+
+    Django's ASGI handler reads sync iterators to the end before sending
+    anything, so under ASGI they are read a batch at a time in the thread
+    of the request instead.
+    """
+    if (
+        hasattr(content, '__aiter__')
+        or not isinstance(getattr(request, '_request', request), ASGIRequest)
+    ):
+        return content
+
+    return _aiterate(iter(content))
+
+
+async def _aiterate(iterator):
+    """Yield the chunks of a sync iterator without blocking the loop"""
+    read_batch = sync_to_async(
+        lambda: list(islice(iterator, STREAM_BATCH_SIZE))
+    )
+    while batch := await read_batch():
+        yield b''.join(map(_to_bytes, batch))
+
+
+def _to_bytes(chunk) -> bytes:
+    """Returns a chunk of a streamed response as bytes"""
+    return chunk.encode() if isinstance(chunk, str) else chunk
+
+
+class AsyncReadMixin:
+    """
+    Serve GET actions that have an `a<action>` coroutine asynchronously
+
+    Only used when ASYNC_READ_VIEWS is set, which is meant for ASGI servers
+    where a waiting coroutine does not hold a worker thread. Other methods
+    of the same route keep running the regular view in a thread.
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if (
+            not settings.ASYNC_READ_VIEWS
+            or not hasattr(cls, f'a{actions.get("get")}')
+        ):
+            return view
+
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_view(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = actions
+            for method, action in actions.items():
+                setattr(self, method, getattr(self, action))
+            self.head = self.get
+
+            return await self.adispatch(request, *args, **kwargs)
+
+        # Keep what DRF and the schema generator read from the view
+        async_view.__dict__.update({
+            name: value for name, value in view.__dict__.items()
+            if name != '__wrapped__'
+        })
+
+        return async_view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Async counterpart of APIView.dispatch"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication reads tokens missing from its cache
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
@@ -0,0 +1,109 @@
+"""
+HTTP caching helpers for the recipe APIs
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def _version_key(user_id: int) -> str:
+    """Returns the cache key of the version counter of the user"""
+    return f'recipe-attrs:version:{user_id}'
+
+
+def get_version(user_id: int) -> int:
+    """
+    Returns the current version of the user's tags and ingredients
+
+    Versions are nanosecond timestamps of the last change, so they double
+    as the Last-Modified time of the cached responses.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+
+    return version
+
+
+async def aget_version(user_id: int) -> int:
+    """Async version of get_version()"""
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, version)
+
+    return version
+
+
+def bump_version(user_id: int):
+    """
+    Moves the user to a new version, orphaning the cached responses
+
+    The version is bumped again on commit, otherwise a request reading
+    between the bump and the commit would cache stale rows as current.
+    """
+    cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+    transaction.on_commit(
+        lambda: cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+    )
+
+
+def response_cache_key(request, prefix: str, version: int) -> str:
+    """Returns the cache key for the response to request"""
+    url = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+    return f'{prefix}:{request.user.pk}:{version}:{url}'
+
+
+def get_cached_data(key: str):
+    """Returns the cached response data or None"""
+    return cache.get(key)
+
+
+async def aget_cached_data(key: str):
+    """Async version of get_cached_data()"""
+    return await cache.aget(key)
+
+
+def set_cached_data(key: str, data):
+    """Stores the response data"""
+    cache.set(key, data, timeout=settings.RECIPE_ATTR_CACHE_TIMEOUT)
+
+
+async def aset_cached_data(key: str, data):
+    """Async version of set_cached_data()"""
+    await cache.aset(key, data, timeout=settings.RECIPE_ATTR_CACHE_TIMEOUT)
+
+
+def make_etag(key: str) -> str:
+    """Returns a quoted ETag for the representation identified by key"""
+    return quote_etag(hashlib.sha256(key.encode()).hexdigest()[:32])
+
+
+def not_modified(request, etag: str, last_modified: int | None = None):
+    """Returns a 304 response if the client has the current representation"""
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified
+    )
+
+
+def set_validators(response, etag: str, last_modified: int | None = None):
+    """Adds validators so clients revalidate with conditional requests"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+
+    patch_cache_control(response, private=True, no_cache=True)
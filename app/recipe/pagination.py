@@ -0,0 +1,290 @@
+"""
+Keyset pagination for the recipe APIs
+"""
+import json
+import operator
+from base64 import b64decode, b64encode
+from functools import reduce
+from urllib import parse
+
+from django.db.models import BooleanField, F, Func, Q, Value
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class RowComparison(Func):
+    """Compares a row of fields with a row of values, `(a, b) < (1, 2)`"""
+    output_field = BooleanField()
+
+    def __init__(self, fields, comparison: str, values):
+        self.comparison = comparison
+        super().__init__(*map(F, fields), *map(Value, values))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sqls, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+
+        size = len(sqls) // 2
+        fields, values = ', '.join(sqls[:size]), ', '.join(sqls[size:])
+        return f'({fields}) {self.comparison} ({values})', params
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination that seeks with `WHERE (keys) < cursor LIMIT n`
+
+    The cursor stores the values of every ordering field of the edge row,
+    so ordering on non unique fields only needs a unique tiebreaker as the
+    last ordering field and pages never fall back to an OFFSET. Orderings
+    in one direction seek with a row comparison, which Postgres turns into
+    an index range scan.
+    """
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    # Types of the cursor values of the ordering fields
+    position_types = {'id': int, 'rank': (int, float), 'name': str}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of the queryset seeking from the cursor"""
+        page_queryset = self._get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+
+        return self._set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Return a single page of the queryset without blocking the loop"""
+        page_queryset = self._get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+
+        return self._set_page([obj async for obj in page_queryset])
+
+    def stream_queryset(self, queryset, request, view=None):
+        """
+        Return an iterator over a single page of the queryset or None
+
+        Rows are read from a database cursor as they are consumed, the
+        links are available once the iterator is exhausted.
+        """
+        page_queryset = self._get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+
+        if self.cursor is not None and self.cursor.reverse:
+            # Rows come in inverted order, the page is read to turn it
+            return iter(self._set_page(list(page_queryset)))
+
+        return self._stream_page(page_queryset.iterator())
+
+    async def astream_queryset(self, queryset, request, view=None):
+        """Return an async iterator over a single page or None"""
+        page_queryset = self._get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+
+        if self.cursor is not None and self.cursor.reverse:
+            page = self._set_page([obj async for obj in page_queryset])
+            return self._astream_rows(page)
+
+        return self._astream_page(page_queryset.aiterator())
+
+    def _stream_page(self, rows):
+        """Yield the rows of the page, keeping the extra row back"""
+        self._start_page()
+        for index, row in enumerate(rows):
+            if self._add_to_page(index, row):
+                yield row
+
+    async def _astream_page(self, rows):
+        """Yield the rows of the page without blocking the loop"""
+        self._start_page()
+        index = 0
+        async for row in rows:
+            if self._add_to_page(index, row):
+                yield row
+            index += 1
+
+    async def _astream_rows(self, rows):
+        """Yield rows already read"""
+        for row in rows:
+            yield row
+
+    def _start_page(self):
+        """Reset the page of a forward stream"""
+        self.page = []
+        self.has_next = False
+        self.has_previous = self.cursor is not None
+
+    def _add_to_page(self, index, row) -> bool:
+        """Keep the edge rows for the links, return False for the extra row"""
+        # The extra row is the last one read, the cursor is read to its end
+        if index == self.page_size:
+            self.has_next = True
+            return False
+
+        self.page = [self.page[0] if self.page else row, row]
+        return True
+
+    def _get_page_queryset(self, queryset, request, view):
+        """Return the queryset of the page, with one extra row, or None"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.cursor is not None and self.cursor.reverse:
+            ordering = self._invert(ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self._seek_filter(ordering, self.cursor.position)
+            )
+
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, results):
+        """Keep the page out of the fetched rows and return it"""
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.cursor is not None and self.cursor.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_next_link(self):
+        """Return the link to the page after the current one"""
+        if not self.has_next:
+            return None
+
+        if not self.page:
+            # Nothing precedes the previous cursor, so the first page follows
+            return remove_query_param(self.base_url, self.cursor_query_param)
+
+        position = self._get_position_from_instance(
+            self.page[-1], self.ordering
+        )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position)
+        )
+
+    def get_previous_link(self):
+        """Return the link to the page before the current one"""
+        if not self.has_previous:
+            return None
+
+        if self.page:
+            position = self._get_position_from_instance(
+                self.page[0], self.ordering
+            )
+        else:
+            position = self.cursor.position
+
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position)
+        )
+
+    def decode_cursor(self, request):
+        """Return the cursor from the request or None on the first page"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            position = json.loads(tokens['p'][0])
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not self._is_valid_position(position):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def _is_valid_position(self, position) -> bool:
+        """Return whether position holds a value per ordering field"""
+        if (
+            not isinstance(position, list)
+            or len(position) != len(self.ordering)
+        ):
+            return False
+
+        return all(
+            isinstance(value, self.position_types[field.lstrip('-')])
+            and not isinstance(value, bool)
+            for field, value in zip(self.ordering, position)
+        )
+
+    def encode_cursor(self, cursor):
+        """Return the current url with the encoded cursor"""
+        tokens = {'p': json.dumps(cursor.position, separators=(',', ':'))}
+        if cursor.reverse:
+            tokens['r'] = '1'
+
+        querystring = parse.urlencode(tokens)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Return values of all ordering fields of the instance or row"""
+        if isinstance(instance, dict):
+            return [instance[field.lstrip('-')] for field in ordering]
+
+        return [getattr(instance, field.lstrip('-')) for field in ordering]
+
+    def _invert(self, ordering):
+        """Return the ordering with every direction flipped"""
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in ordering
+        )
+
+    def _seek_filter(self, ordering, position):
+        """Return a filter for rows strictly after position in ordering"""
+        names = [field.lstrip('-') for field in ordering]
+        descending = {field.startswith('-') for field in ordering}
+        if len(ordering) > 1 and len(descending) == 1:
+            comparison = '<' if descending.pop() else '>'
+            return RowComparison(names, comparison, position)
+
+        clauses = []
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': value}))
+            equal[name] = value
+
+        return reduce(operator.or_, clauses)
+
+
+class NameKeysetPagination(KeysetPagination):
+    """Keyset pagination over name with the id as tiebreaker"""
+    ordering = ('-name', '-id')
+
+
+class RankKeysetPagination(KeysetPagination):
+    """Keyset pagination over search rank with the id as tiebreaker"""
+    ordering = ('-rank', '-id')
@@ -0,0 +1,77 @@
+"""
+Parsers for the recipe APIs
+"""
+import codecs
+import json
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def decode_json(data: bytes | str):
+    """Decodes a JSON document, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser decoding with orjson when it is installed
+
+    Like JSONParser, decimal numbers are parsed as floats, decimal fields
+    convert them through their shortest repr, so prices stay exact.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the JSON body of the request"""
+        # orjson rejects NaN and Infinity like strict parsing does
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read()
+            if codecs.lookup(encoding).name != 'utf-8':
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class NDJSONParser(BaseParser):
+    """Parses newline delimited JSON into a list of objects"""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Return a list with one item per non empty line"""
+        if stream is None:
+            return []
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        items = []
+        for number, line in enumerate(codecs.getreader(encoding)(stream), 1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                items.append(decode_json(line))
+            except ValueError as exc:
+                raise ParseError(
+                    f'NDJSON parse error on line {number} - {exc}'
+                )
+
+        return items
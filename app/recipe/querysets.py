@@ -0,0 +1,262 @@
+"""
+Queryset builders for the recipe APIs
+"""
+from django.contrib.postgres.aggregates.mixins import OrderableAggMixin
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import (
+    Aggregate,
+    BooleanField,
+    Case,
+    Count,
+    Exists,
+    ExpressionWrapper,
+    Func,
+    JSONField,
+    OuterRef,
+    Prefetch,
+    Q,
+    QuerySet,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce, Upper
+
+from core.models import Recipe, Tag, Ingredient
+
+
+def filter_by_related(
+    queryset: QuerySet,
+    field_name: str,
+    ids: list[int],
+    match_all: bool = False
+) -> QuerySet:
+    """
+    Filter recipes linked to any (or all) of ids through a M2M field
+
+    Uses correlated EXISTS subqueries over the through table, so rows are
+    never multiplied by a join and no DISTINCT is needed.
+    """
+    field = Recipe._meta.get_field(field_name)
+    links = field.remote_field.through.objects.filter(
+        **{field.m2m_field_name(): OuterRef('pk')}
+    )
+    related_name = field.m2m_reverse_field_name()
+
+    if not match_all:
+        return queryset.filter(
+            Exists(links.filter(**{f'{related_name}__in': ids}))
+        )
+
+    for related_id in set(ids):
+        queryset = queryset.filter(
+            Exists(links.filter(**{related_name: related_id}))
+        )
+
+    return queryset
+
+
+def _recipe_field(model):
+    """Return the recipe M2M field linking to model"""
+    return next(
+        field for field in Recipe._meta.many_to_many
+        if field.related_model is model
+    )
+
+
+def recipe_count(model) -> Coalesce:
+    """
+    Return the number of recipes using a tag or ingredient
+
+    Counted by a correlated subquery over the through table, so it can be
+    combined with other filters without a GROUP BY over the whole queryset.
+    """
+    field = _recipe_field(model)
+    related_name = field.m2m_reverse_field_name()
+    links = field.remote_field.through.objects.filter(
+        **{related_name: OuterRef('pk')}
+    ).order_by().values(related_name).annotate(count=Count('pk'))
+
+    return Coalesce(Subquery(links.values('count')), Value(0))
+
+
+def filter_assigned(queryset: QuerySet) -> QuerySet:
+    """Filter tags or ingredients used by at least one recipe"""
+    field = _recipe_field(queryset.model)
+    links = field.remote_field.through.objects.filter(
+        **{field.m2m_reverse_field_name(): OuterRef('pk')}
+    )
+
+    return queryset.filter(Exists(links))
+
+
+def autocomplete(queryset: QuerySet, text: str, limit: int) -> QuerySet:
+    """
+    Return at most limit tags or ingredients whose name matches text
+
+    Prefix matches come first ordered by how many recipes use them, then
+    names similar to text ordered by similarity. Both conditions are
+    served by the trigram index on UPPER(name).
+    """
+    text = text.upper()
+    is_prefix = Q(upper_name__startswith=text)
+
+    return queryset.alias(upper_name=Upper('name')).filter(
+        is_prefix | Q(upper_name__trigram_similar=text)
+    ).annotate(
+        is_prefix=ExpressionWrapper(is_prefix, output_field=BooleanField()),
+        similarity=TrigramSimilarity('upper_name', text),
+        recipe_count=recipe_count(queryset.model),
+    ).order_by(
+        '-is_prefix',
+        Case(When(is_prefix, then='recipe_count'), default=0).desc(),
+        '-similarity',
+        '-recipe_count',
+        'name'
+    )[:limit]
+
+
+class RecipeQuerysetBuilder:
+    """
+    Tune a recipe queryset for the viewset action that is going to use it
+
+    Passing the fields the response is limited to reads only their columns
+    and prefetches only the relations among them.
+    """
+    # Columns used by RecipeSerializer, description and image are detail only
+    LIST_FIELDS = [
+        'id', 'title', 'time_minutes', 'price', 'link', 'image_renditions'
+    ]
+    LIST_ACTIONS = ['list', 'export']
+    PREFETCH_ACTIONS = ['list', 'export', 'retrieve']
+    RELATED_FIELDS = ['tags', 'ingredients']
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        action: str | None,
+        fields: list[str] | None = None
+    ):
+        self.queryset = queryset
+        self.action = action
+        self.fields = fields
+
+    def get_columns(self) -> list[str] | None:
+        """Return the columns to read, None to read all of them"""
+        if self.fields is not None:
+            return ['id'] + [
+                name for name in self.fields
+                if name != 'id' and name not in self.RELATED_FIELDS
+            ]
+        elif self.action in self.LIST_ACTIONS:
+            return self.LIST_FIELDS
+
+        return None
+
+    def get_prefetches(self) -> list[Prefetch]:
+        """Return prefetches for the nested tags and ingredients"""
+        prefetches = {
+            'tags': Prefetch(
+                'tags',
+                queryset=Tag.objects.only('id', 'name').order_by('id')
+            ),
+            'ingredients': Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only('id', 'name').order_by('id')
+            ),
+        }
+
+        return [
+            prefetch for name, prefetch in prefetches.items()
+            if self.fields is None or name in self.fields
+        ]
+
+    def build(self) -> QuerySet:
+        """Return the queryset with columns and prefetches for the action"""
+        queryset = self.queryset
+
+        columns = self.get_columns()
+        if columns is not None:
+            queryset = queryset.only(*columns)
+
+        if self.action in self.PREFETCH_ACTIONS:
+            queryset = queryset.prefetch_related(*self.get_prefetches())
+
+        return queryset
+
+
+class JSONBuildObject(Func):
+    """
+    Builds a json object of fields in their order
+
+    Unlike JSONObject, which builds jsonb and so sorts the keys.
+    """
+    function = 'JSON_BUILD_OBJECT'
+    output_field = JSONField()
+
+    def __init__(self, **fields):
+        expressions = []
+        for key, value in fields.items():
+            # Typed keys, the function takes arguments of any type
+            expressions.extend((Cast(Value(key), TextField()), value))
+        super().__init__(*expressions)
+
+
+class JSONAgg(OrderableAggMixin, Aggregate):
+    """Aggregates values into a json array"""
+    function = 'JSON_AGG'
+    template = '%(function)s(%(distinct)s%(expressions)s %(ordering)s)'
+    output_field = JSONField()
+
+
+def _related_json(field_name: str) -> Coalesce:
+    """Returns the json array of {id, name} linked to a recipe by field"""
+    field = Recipe._meta.get_field(field_name)
+    related_name = field.m2m_reverse_field_name()
+    links = field.remote_field.through.objects.filter(
+        **{field.m2m_field_name(): OuterRef('pk')}
+    )
+
+    return Coalesce(
+        Subquery(
+            links.order_by()
+            .values(field.m2m_field_name())
+            .annotate(items=JSONAgg(
+                JSONBuildObject(
+                    id=f'{related_name}_id', name=f'{related_name}__name'
+                ),
+                ordering=f'{related_name}_id'
+            ))
+            .values('items')
+        ),
+        RawSQL("'[]'::json", [], output_field=JSONField())
+    )
+
+
+def recipe_json(fields: list[str] = None) -> Cast:
+    """
+    Returns the text of a recipe as RecipeSerializer represents it, without
+    its image renditions, which need the storage to build their URLs
+
+    Only id and the given fields are built when fields are passed.
+    """
+    values = {
+        'id': 'id',
+        'title': 'title',
+        'time_minutes': 'time_minutes',
+        # numeric keeps its scale as text, like DecimalField does
+        'price': Cast('price', TextField()),
+        'link': 'link',
+        'tags': _related_json('tags'),
+        'ingredients': _related_json('ingredients'),
+    }
+
+    return Cast(
+        JSONBuildObject(**{
+            name: value for name, value in values.items()
+            if fields is None or name in fields or name == 'id'
+        }),
+        TextField()
+    )
@@ -0,0 +1,172 @@
+"""
+Renderers for the recipe APIs and streaming recipe exports
+"""
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _encode_default(obj):
+    """Encodes values orjson can't, e.g. Decimal or lazy strings"""
+    return JSONEncoder().default(obj)
+
+
+def encode_json(data) -> bytes:
+    """
+    Encodes data like JSONRenderer does, with orjson when it is installed
+
+    Values orjson has no native encoding for, like Decimal, and datetimes,
+    which DRF formats differently, go through DRF's encoder, so the output
+    matches. Decimal fields are already strings unless
+    COERCE_DECIMAL_TO_STRING is off. orjson always writes compact UTF-8,
+    so the json module is used when COMPACT_JSON or UNICODE_JSON is off.
+    """
+    ret = None
+    if (
+        orjson is not None
+        and api_settings.COMPACT_JSON
+        and api_settings.UNICODE_JSON
+    ):
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_encode_default,
+                option=(
+                    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                ),
+            )
+        except TypeError:
+            # E.g. integers over 64 bits, which the json module handles
+            pass
+
+    if ret is None:
+        ret = json.dumps(
+            data,
+            cls=JSONEncoder,
+            ensure_ascii=not api_settings.UNICODE_JSON,
+            allow_nan=not api_settings.STRICT_JSON,
+            separators=(',', ':') if api_settings.COMPACT_JSON else None,
+        ).encode()
+
+    return escape_line_separators(ret)
+
+
+def escape_line_separators(content: bytes) -> bytes:
+    """Escapes U+2028 and U+2029 to keep JSON safe to embed in JavaScript"""
+    return content.replace('\u2028'.encode(), b'\\u2028').replace(
+        '\u2029'.encode(), b'\\u2029'
+    )
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when it is installed
+
+    Indented output, requested through the accepted media type, is left to
+    JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON bytes"""
+        if data is None:
+            return b''
+
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return encode_json(data)
+
+
+class StreamRenderer(BaseRenderer):
+    """
+    Base renderer for exports streamed row by row
+
+    Views stream rows through `render_stream` or `arender_stream`, `render`
+    is only used for error responses which are rendered as JSON.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render non streamed data, e.g. errors"""
+        return FastJSONRenderer().render(
+            data, renderer_context=renderer_context
+        )
+
+    def render_header(self, fields: list[str]):
+        """Return the chunk preceding the rows, if any"""
+        return None
+
+    def render_row(self, row, fields: list[str]):
+        """Return the encoded chunk of a row"""
+        raise NotImplementedError('render_row() must be implemented.')
+
+    def render_stream(self, rows, fields: list[str]):
+        """Yield encoded chunks for every row"""
+        header = self.render_header(fields)
+        if header is not None:
+            yield header
+        for row in rows:
+            yield self.render_row(row, fields)
+
+    async def arender_stream(self, rows, fields: list[str]):
+        """Yield encoded chunks for every row of an async iterable"""
+        header = self.render_header(fields)
+        if header is not None:
+            yield header
+        async for row in rows:
+            yield self.render_row(row, fields)
+
+
+class NDJSONRenderer(StreamRenderer):
+    """Renders every row as a JSON object on its own line"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render_row(self, row, fields: list[str]):
+        """Return the row as a JSON line"""
+        return encode_json(row) + b'\n'
+
+
+class _Echo:
+    """File like object returning what is written to it"""
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(StreamRenderer):
+    """Renders rows as CSV, nested objects are flattened to their names"""
+    media_type = 'text/csv'
+    format = 'csv'
+    nested_separator = '|'
+
+    def _flatten(self, value):
+        """Return a CSV friendly representation of the value"""
+        if isinstance(value, list):
+            return self.nested_separator.join(
+                str(item['name']) if isinstance(item, dict) else str(item)
+                for item in value
+            )
+        if isinstance(value, dict):
+            return json.dumps(value, cls=JSONEncoder) if value else ''
+        return value
+
+    def __init__(self):
+        self.writer = csv.writer(_Echo())
+
+    def render_header(self, fields: list[str]):
+        """Return the header line"""
+        return self.writer.writerow(fields)
+
+    def render_row(self, row, fields: list[str]):
+        """Return the row as a CSV line"""
+        return self.writer.writerow(
+            [self._flatten(row[field]) for field in fields]
+        )
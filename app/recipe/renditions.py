@@ -0,0 +1,157 @@
+"""
+Resized renditions of recipe images
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+
+from core.models import Recipe
+from core.sync import record_changes
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels of every rendition
+RENDITION_SIZES = {
+    'thumb': 160,
+    'small': 480,
+    'medium': 1024,
+}
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Returns the worker pool of this process, creating it on first use"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_RENDITION_WORKERS,
+                thread_name_prefix='recipe-renditions'
+            )
+
+    return _executor
+
+
+def _storage():
+    """Returns the storage of recipe images"""
+    return Recipe._meta.get_field('image').storage
+
+
+def rendition_name(image_name: str, size: str, extension: str) -> str:
+    """Returns the storage name of a rendition of the image"""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return os.path.join(
+        'uploads', 'recipe', 'renditions', f'{stem}_{size}.{extension}'
+    )
+
+
+def delete_renditions(renditions: dict):
+    """Deletes rendition files from storage"""
+    storage = _storage()
+    for formats in renditions.values():
+        for name in formats.values():
+            storage.delete(name)
+
+
+def create_renditions(recipe_id: int, image_name: str) -> dict:
+    """
+    Decodes the image once and stores every size in every format
+
+    Sizes are produced from the largest to the smallest by shrinking the
+    same decoded image in place. Returns the stored rendition names.
+    """
+    storage = _storage()
+    renditions = {}
+
+    with storage.open(image_name) as file, Image.open(file) as image:
+        largest = max(RENDITION_SIZES.values())
+        # Lets the JPEG decoder skip detail the renditions do not need
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+        sizes = sorted(RENDITION_SIZES.items(), key=lambda item: -item[1])
+        for size, pixels in sizes:
+            image.thumbnail((pixels, pixels), Image.Resampling.LANCZOS)
+
+            for extension, (image_format, options) in (
+                RENDITION_FORMATS.items()
+            ):
+                buffer = io.BytesIO()
+                image.save(buffer, image_format, **options)
+                renditions.setdefault(size, {})[extension] = storage.save(
+                    rendition_name(image_name, size, extension),
+                    ContentFile(buffer.getvalue())
+                )
+
+    recipes = Recipe.objects.filter(pk=recipe_id, image=image_name)
+    with transaction.atomic():
+        updated = recipes.update(
+            image_renditions=renditions,
+            updated_at=timezone.now()
+        )
+        if updated:
+            # Queryset updates send no signals
+            user_id = recipes.values_list('user_id', flat=True).get()
+            record_changes(Recipe, user_id, [recipe_id])
+
+    if not updated:
+        # The image was replaced or the recipe deleted in the meantime
+        delete_renditions(renditions)
+        return {}
+
+    return renditions
+
+
+def _process(recipe_id: int, image_name: str, stale: dict):
+    """Creates new renditions and deletes the replaced ones"""
+    try:
+        create_renditions(recipe_id, image_name)
+        delete_renditions(stale)
+    except Exception:
+        logger.exception('Creating renditions of recipe %s failed', recipe_id)
+
+
+def _process_in_worker(recipe_id: int, image_name: str, stale: dict):
+    """Processes the image in a worker thread, closing its connections"""
+    try:
+        _process(recipe_id, image_name, stale)
+    finally:
+        connections.close_all()
+
+
+def schedule_renditions(
+    recipe_id: int, image_name: str, stale: dict | None = None
+):
+    """
+    Creates renditions once the upload is committed
+
+    Work goes to the worker pool so uploads do not wait for it, with
+    RECIPE_RENDITION_WORKERS set to 0 it runs in the request instead.
+    """
+    stale = stale or {}
+
+    def submit():
+        if settings.RECIPE_RENDITION_WORKERS:
+            _get_executor().submit(
+                _process_in_worker, recipe_id, image_name, stale
+            )
+        else:
+            _process(recipe_id, image_name, stale)
+
+    transaction.on_commit(submit)
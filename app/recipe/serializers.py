@@ -1,6 +1,18 @@
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterator
+from operator import itemgetter
+
+from django.db import transaction
+
 from rest_framework import serializers
 
 from core.models import Recipe, Tag, Ingredient
+from core.sync import record_changes
+
+from .caching import bump_version
+from .querysets import recipe_json
+from .renderers import encode_json, escape_line_separators
+from .uploads import StoredImage
 
 from typing import TypeVar
 
@@ -9,41 +21,156 @@ T = TypeVar('T', Tag, Ingredient)
 
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for Tag object"""
+    # Only present when the queryset annotates it
+    recipe_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Tag
-        fields = ['id', 'name']
+        fields = ['id', 'name', 'recipe_count']
         read_only_fields = ['id']
 
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for Ingredient object"""
+    # Only present when the queryset annotates it
+    recipe_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Ingredient
-        fields = ['id', 'name']
+        fields = ['id', 'name', 'recipe_count']
         read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(serializers.ListSerializer):
+    """Serializer for creating many recipes with set based queries"""
+    batch_size = 1000
+
+    def validate_items(self) -> tuple[list[tuple[int, dict]], list[dict]]:
+        """
+        Validate items one by one instead of failing the whole list
+        Returns indexed validated data and indexed errors
+        """
+        valid, errors = [], []
+        for index, item in enumerate(self.initial_data):
+            try:
+                valid.append((index, self.child.run_validation(item)))
+            except serializers.ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+
+        return valid, errors
+
+    def _link_objects(self, recipes, items, field_name, ObjectClass: T):
+        """Links recipes to objects named in items with bulk inserts"""
+        auth_user = self.context['request'].user
+        names = [
+            object['name']
+            for item in items
+            for object in item.get(field_name, [])
+        ]
+        objects = {
+            object.name: object
+            for object in ObjectClass.objects.get_or_create_many(
+                auth_user, names
+            )
+        }
+
+        field = Recipe._meta.get_field(field_name)
+        Through = field.remote_field.through
+        links = [
+            Through(**{
+                field.m2m_field_name(): recipe,
+                field.m2m_reverse_field_name(): objects[name]
+            })
+            for recipe, item in zip(recipes, items)
+            for name in dict.fromkeys(
+                object['name'] for object in item.get(field_name, [])
+            )
+        ]
+        Through.objects.bulk_create(links, batch_size=self.batch_size)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Create all recipes with a constant number of queries per batch"""
+        auth_user = self.context['request'].user
+        recipes = [
+            Recipe(user=auth_user, **{
+                attr: value for attr, value in item.items()
+                if attr not in ('tags', 'ingredients')
+            })
+            for item in validated_data
+        ]
+        Recipe.objects.bulk_create(recipes, batch_size=self.batch_size)
+
+        self._link_objects(recipes, validated_data, 'tags', Tag)
+        self._link_objects(recipes, validated_data, 'ingredients', Ingredient)
+        # Bulk inserts send no signals
+        for start in range(0, len(recipes), self.batch_size):
+            batch = recipes[start:start + self.batch_size]
+            Recipe.objects.filter(
+                pk__in=[recipe.pk for recipe in batch]
+            ).update_search_vector()
+        record_changes(Recipe, auth_user.pk, [recipe.pk for recipe in recipes])
+        bump_version(auth_user.pk)
+
+        return recipes
+
+
+def rendition_urls(
+    renditions: dict, request=None
+) -> dict[str, dict[str, str]]:
+    """Returns URLs of image renditions by size and format"""
+    storage = Recipe._meta.get_field('image').storage
+
+    def url(name):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+
+    return {
+        size: {extension: url(name) for extension, name in formats.items()}
+        for size, formats in renditions.items()
+    }
+
+
+class SparseFieldsMixin:
+    """Serializer mixin representing only the fields passed as fields"""
+
+    def __init__(self, *args, fields: list[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Recipe object"""
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients']
+        fields = [
+            'id', 'title', 'time_minutes', 'price', 'link', 'tags',
+            'ingredients', 'image_renditions'
+        ]
         read_only_fields = ['id']
+        list_serializer_class = RecipeListSerializer
 
-    def _get_or_create_objects(self, objects: list[T], recipe_objects: list[T], ObjectClass: T):
-        """Gets or creats objects as needed"""
+    def get_image_renditions(self, recipe) -> dict[str, dict[str, str]]:
+        """Returns URLs of the image renditions by size and format"""
+        return rendition_urls(
+            recipe.image_renditions, self.context.get('request')
+        )
+
+    def _get_or_create_objects(
+        self, objects: list[dict], ObjectClass: T
+    ) -> list[T]:
+        """Gets or creates objects as needed with set based queries"""
         auth_user = self.context['request'].user
-        for object in objects:
-            object_obj, _ = ObjectClass.objects.get_or_create(
-                user=auth_user,
-                **object
-            )
-            recipe_objects.add(object_obj)
+        return ObjectClass.objects.get_or_create_many(
+            auth_user,
+            [object['name'] for object in objects]
+        )
 
     def create(self, validated_data):
         """Create a recipe"""
@@ -51,8 +178,12 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
 
-        self._get_or_create_objects(tags, recipe.tags, Tag)
-        self._get_or_create_objects(ingredients, recipe.ingredients, Ingredient)
+        if tags:
+            recipe.tags.add(*self._get_or_create_objects(tags, Tag))
+        if ingredients:
+            recipe.ingredients.add(
+                *self._get_or_create_objects(ingredients, Ingredient)
+            )
 
         return recipe
 
@@ -61,13 +192,14 @@ class RecipeSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
 
+        # set() diffs against the current links and only touches changed ones
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_objects(tags, instance.tags, Tag)
+            instance.tags.set(self._get_or_create_objects(tags, Tag))
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_objects(ingredients, instance.ingredients, Ingredient)
+            instance.ingredients.set(
+                self._get_or_create_objects(ingredients, Ingredient)
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -75,6 +207,196 @@ class RecipeSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+
+class RecipeValuesSerializer:
+    """
+    Read only counterpart of RecipeSerializer for lists of values() rows
+
+    Builds the same output without DRF field objects, which dominate the
+    time of large lists. Tags and ingredients of all rows are read with one
+    query each, like the prefetches of RecipeSerializer lists. Passing
+    fields limits the columns read and the relations linked to them.
+    """
+    fields = [
+        'id', 'title', 'time_minutes', 'price', 'link', 'image_renditions'
+    ]
+    related = ['tags', 'ingredients']
+    price_field = serializers.DecimalField(
+        max_digits=Recipe._meta.get_field('price').max_digits,
+        decimal_places=Recipe._meta.get_field('price').decimal_places
+    )
+
+    def __init__(self, request=None, fields: list[str] = None):
+        self.request = request
+        # In the order of RecipeSerializer, id is needed to link rows
+        self.represented = [
+            name for name in RecipeSerializer.Meta.fields
+            if fields is None or name in fields or name == 'id'
+        ]
+        self.fields = [
+            name for name in self.fields if name in self.represented
+        ]
+        self.related = [
+            name for name in self.related if name in self.represented
+        ]
+
+    def values(self, queryset, *extra_fields):
+        """Returns the rows of queryset with the fields to represent"""
+        return queryset.prefetch_related(None).values(
+            *self.fields, *extra_fields
+        )
+
+    def _links(self, name: str, ids: list[int]):
+        """Returns (recipe id, id, name) of objects linked to recipes by id"""
+        field = Recipe._meta.get_field(name)
+        target = field.m2m_reverse_field_name()
+
+        return field.remote_field.through.objects.filter(
+            **{f'{field.m2m_field_name()}_id__in': ids}
+        ).order_by(f'{target}_id').values_list(
+            field.m2m_field_name() + '_id', f'{target}_id', f'{target}__name'
+        )
+
+    def to_representation(self, rows: list[dict]) -> list[dict]:
+        """Returns the representation of every row"""
+        ids = [row['id'] for row in rows]
+        links = {
+            name: list(self._links(name, ids)) if ids else []
+            for name in self.related
+        }
+
+        return self._build(rows, links)
+
+    async def ato_representation(self, rows: list[dict]) -> list[dict]:
+        """Returns the representation of every row without blocking"""
+        ids = [row['id'] for row in rows]
+        links = {name: [] for name in self.related}
+        if ids:
+            for name in self.related:
+                links[name] = [link async for link in self._links(name, ids)]
+
+        return self._build(rows, links)
+
+    def _build(self, rows: list[dict], links: dict) -> list[dict]:
+        """Returns the representation of rows and their related objects"""
+        nested = {}
+        for name, name_links in links.items():
+            nested[name] = defaultdict(list)
+            for recipe_id, obj_id, obj_name in name_links:
+                nested[name][recipe_id].append(
+                    {'id': obj_id, 'name': obj_name}
+                )
+
+        getters = [
+            (name, self._getter(name, nested)) for name in self.represented
+        ]
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+    def _getter(self, name: str, nested: dict):
+        """Returns a function getting the representation of name from rows"""
+        if name in nested:
+            related = nested[name]
+            return lambda row: related.get(row['id'], [])
+        elif name == 'price':
+            price = self.price_field.to_representation
+            return lambda row: price(row['price'])
+        elif name == 'image_renditions':
+            return lambda row: rendition_urls(
+                row['image_renditions'], self.request
+            )
+
+        return itemgetter(name)
+
+
+class RecipeJSONSerializer:
+    """
+    Recipe lists rendered by Postgres
+
+    Every row carries the JSON text of its recipe built by recipe_json(),
+    which is streamed into the page without model instances or dicts. Only
+    the image renditions are added here, their URLs need the storage.
+    """
+
+    def __init__(self, request=None, fields: list[str] = None):
+        self.request = request
+        self.fields = fields
+
+    def values(self, queryset, *extra_fields):
+        """Returns the rows of queryset with the JSON text of each recipe"""
+        if self.fields is None or 'image_renditions' in self.fields:
+            extra_fields = ('image_renditions', *extra_fields)
+
+        return queryset.prefetch_related(None).values(
+            'id', *extra_fields, json=recipe_json(self.fields)
+        )
+
+    def _render_row(self, row: dict) -> bytes:
+        """Returns the JSON of a row with its image renditions"""
+        if 'image_renditions' not in row:
+            return row['json'].encode()
+
+        renditions = row['image_renditions']
+        urls = encode_json(
+            rendition_urls(renditions, self.request)
+        ) if renditions else b'{}'
+
+        # Renditions are the last field, replace the closing brace with them
+        return b'%s, "image_renditions" : %s}' % (
+            row['json'][:-1].encode(), urls
+        )
+
+    def _render_item(self, index: int, row: dict) -> bytes:
+        """Returns the JSON of the row at index of an array"""
+        return escape_line_separators(
+            (b', ' if index else b'') + self._render_row(row)
+        )
+
+    def _render_links(self, paginator) -> bytes:
+        """Returns the closing of a page with the links of paginator"""
+        return (
+            b'],"next":' + encode_json(paginator.get_next_link())
+            + b',"previous":' + encode_json(paginator.get_previous_link())
+            + b'}'
+        )
+
+    def stream(self, rows) -> Iterator[bytes]:
+        """Yields the JSON array of rows as they are read"""
+        yield b'['
+        for index, row in enumerate(rows):
+            yield self._render_item(index, row)
+        yield b']'
+
+    async def astream(self, rows) -> AsyncIterator[bytes]:
+        """Yields the JSON array of rows without blocking"""
+        yield b'['
+        index = 0
+        async for row in rows:
+            yield self._render_item(index, row)
+            index += 1
+        yield b']'
+
+    def stream_page(self, rows, paginator) -> Iterator[bytes]:
+        """
+        Yields the JSON of a page like KeysetPagination responses
+
+        The links follow the results, paginator only knows them once the
+        rows are read.
+        """
+        yield b'{"results":['
+        for index, row in enumerate(rows):
+            yield self._render_item(index, row)
+        yield self._render_links(paginator)
+
+    async def astream_page(self, rows, paginator) -> AsyncIterator[bytes]:
+        """Yields the JSON of a page without blocking"""
+        yield b'{"results":['
+        index = 0
+        async for row in rows:
+            yield self._render_item(index, row)
+            index += 1
+        yield self._render_links(paginator)
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view"""
 
@@ -82,12 +404,113 @@ class RecipeDetailSerializer(RecipeSerializer):
         fields = RecipeSerializer.Meta.fields + ['description', 'image']
 
 
+class RecipeSyncSerializer(serializers.ModelSerializer):
+    """Serializer for recipes of syncing clients, linking objects by id"""
+    tags = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    ingredients = serializers.PrimaryKeyRelatedField(
+        many=True, read_only=True
+    )
+    image_renditions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = [
+            'id', 'title', 'time_minutes', 'price', 'link', 'description',
+            'tags', 'ingredients', 'image', 'image_renditions', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    def get_image_renditions(self, recipe) -> dict[str, dict[str, str]]:
+        """Returns URLs of the image renditions by size and format"""
+        return rendition_urls(
+            recipe.image_renditions, self.context.get('request')
+        )
+
+
+class TagSyncSerializer(serializers.ModelSerializer):
+    """Serializer for tags of syncing clients"""
+
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'updated_at']
+        read_only_fields = fields
+
+
+class IngredientSyncSerializer(serializers.ModelSerializer):
+    """Serializer for ingredients of syncing clients"""
+
+    class Meta:
+        model = Ingredient
+        fields = ['id', 'name', 'updated_at']
+        read_only_fields = fields
+
+
+class RecipeChangesSerializer(serializers.Serializer):
+    """Changed recipes and ids of deleted ones"""
+    changed = RecipeSyncSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+
+
+class TagChangesSerializer(serializers.Serializer):
+    """Changed tags and ids of deleted ones"""
+    changed = TagSyncSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+
+
+class IngredientChangesSerializer(serializers.Serializer):
+    """Changed ingredients and ids of deleted ones"""
+    changed = IngredientSyncSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of syncs"""
+    cursor = serializers.IntegerField(
+        min_value=0, default=0,
+        help_text='Cursor returned by the last sync, 0 for a first sync'
+    )
+    limit = serializers.IntegerField(
+        min_value=1, max_value=2000, default=500,
+        help_text='Maximum number of changed and deleted objects to return'
+    )
+
+
+class SyncSerializer(serializers.Serializer):
+    """Changes of the recipes, tags and ingredients since a sync cursor"""
+    cursor = serializers.IntegerField(
+        help_text='Cursor of the next sync'
+    )
+    more = serializers.BooleanField(
+        help_text='Whether more changes are left, sync again right away'
+    )
+    recipes = RecipeChangesSerializer()
+    tags = TagChangesSerializer()
+    ingredients = IngredientChangesSerializer()
+
+
+class StoredImageField(serializers.ImageField):
+    """Image field accepting images validated and stored while uploading"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, StoredImage):
+            return data
+
+        return super().to_internal_value(data)
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
+    image = StoredImageField(required=True)
 
     class Meta:
         model = Recipe
         fields = ['id', 'image']
         read_only_fields = ['id']
-        extra_kwargs = {'image': {'required': 'True'}}
 
+    def update(self, instance, validated_data):
+        """Update the recipe, referencing already stored images by name"""
+        image = validated_data.get('image')
+        if isinstance(image, StoredImage):
+            validated_data['image'] = image.storage_name
+
+        return super().update(instance, validated_data)
@@ -0,0 +1,32 @@
+"""
+Signal receivers keeping recipe caches current
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag, Ingredient
+
+from .caching import bump_version
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_attr_version(sender, instance, **kwargs):
+    """Invalidate cached lists when a tag or an ingredient changes"""
+    bump_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def bump_attr_version_on_recipe_delete(sender, instance, **kwargs):
+    """Invalidate assigned_only lists, links are deleted with the recipe"""
+    bump_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_attr_version_on_links(sender, instance, action, **kwargs):
+    """Invalidate assigned_only lists when recipe links change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version(instance.user_id)
@@ -1,6 +1,7 @@
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import TestCase
 
@@ -16,10 +17,12 @@ from recipe.serializers import IngredientSerializer
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
 
+
 def detail_url(ingredient_id):
     """Returns a url for getting ingredient detail"""
     return reverse('recipe:ingredient-detail', args=[ingredient_id])
 
+
 def create_user(email='user@test.test', password='testpass123'):
     """Creates and returns a user"""
     user = get_user_model().objects.create_user(
@@ -44,6 +47,7 @@ class PublicIngredientsAPITests(TestCase):
 class PrivateIngredientsAPITests(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.user = create_user()
         self.client = APIClient()
 
@@ -58,11 +62,13 @@ class PrivateIngredientsAPITests(TestCase):
         Ingredient.objects.create(name='ham', user=another_user)
 
         res = self.client.get(INGREDIENTS_URL)
-        ingredients = Ingredient.objects.filter(user=self.user).order_by('-name')
+        ingredients = Ingredient.objects.filter(
+            user=self.user
+        ).order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_update_ingredient_auth(self):
         """Test updating an ingredient"""
@@ -106,8 +112,8 @@ class PrivateIngredientsAPITests(TestCase):
         s1 = IngredientSerializer(in1)
         s2 = IngredientSerializer(in2)
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_ingredients_unique(self):
         """Test filtered ingredients returns a unique list"""
@@ -129,5 +135,70 @@ class PrivateIngredientsAPITests(TestCase):
         recipe2.ingredients.add(ingredient)
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_ingredients_cache_invalidated_on_link(self):
+        """Test linking ingredients to recipes refreshes assigned_only lists"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        recipe = Recipe.objects.create(
+            title='Risotto',
+            time_minutes=30,
+            price=Decimal('6.00'),
+            user=self.user
+        )
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+        self.assertEqual(res.data['results'], [])
+
+        recipe.ingredients.add(ingredient)
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_autocomplete_ingredients(self):
+        """Test autocompleting ranks prefixes, then similar names by usage"""
+        Ingredient.objects.create(user=self.user, name='Potato')
+        tomato = Ingredient.objects.create(user=self.user, name='Tomato')
+        tomatillo = Ingredient.objects.create(user=self.user, name='Tomatillo')
+        Ingredient.objects.create(
+            user=create_user('u2@test.test'), name='Tomato'
+        )
+        recipe = Recipe.objects.create(
+            title='Salsa',
+            time_minutes=10,
+            price=Decimal('2.00'),
+            user=self.user
+        )
+        recipe.ingredients.add(tomatillo)
+
+        res = self.client.get(INGREDIENTS_URL, {'q': 'tom'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (item['name'], item['recipe_count'])
+                for item in res.data['results']
+            ],
+            [(tomatillo.name, 1), (tomato.name, 0)]
+        )
+
+        res = self.client.get(INGREDIENTS_URL, {'q': 'tomatos'})
+        self.assertEqual(res.data['results'][0]['id'], tomato.id)
+
+    def test_autocomplete_ingredients_capped(self):
+        """Test autocomplete returns a limited number of matches"""
+        Ingredient.objects.bulk_create(
+            Ingredient(user=self.user, name=f'Pepper {index}')
+            for index in range(30)
+        )
+
+        res = self.client.get(INGREDIENTS_URL, {'q': 'pep'})
+
+        self.assertEqual(len(res.data['results']), 20)
+        self.assertIsNone(res.data['next'])
+
+    def test_autocomplete_ingredients_with_counts(self):
+        """Test autocomplete can be combined with with_counts"""
+        Ingredient.objects.create(user=self.user, name='Tomato')
+
+        res = self.client.get(INGREDIENTS_URL, {'q': 'tom', 'with_counts': 1})
 
+        self.assertEqual(res.data['results'][0]['recipe_count'], 0)
@@ -0,0 +1,137 @@
+"""
+Tests for query count and wall time budgets of the recipe API
+"""
+import random
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from benchmarks import api
+from core.models import Ingredient, Recipe
+from core.tests.query_budget import QueryBudgetMixin
+
+
+# Recipes of the seeded user, the middle size of the API benchmark
+RECIPES = 1000
+
+
+class RecipeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test the recipe API routes stay within their budgets"""
+    budget_file = Path(__file__).with_name('query_budgets.json')
+    budget_namespaces = ('recipe',)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.tags = api.seed_user(RECIPES, random.Random(api.SEED))
+        cls.ingredients = list(
+            Ingredient.objects.filter(user=cls.user).order_by('id')
+        )
+        cls.recipe = Recipe.objects.filter(user=cls.user).latest('id')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_recipe_reads(self):
+        """Test reading recipes"""
+        self.assertWithinBudget('get', 'recipe:api-root')
+        self.assertWithinBudget('get', 'recipe:recipe-list')
+        self.assertWithinBudget(
+            'get', 'recipe:recipe-list', label='tags',
+            data={'tags': f'{self.tags[0].id},{self.tags[1].id}'}
+        )
+        self.assertWithinBudget(
+            'get', 'recipe:recipe-list', label='search',
+            data={'search': 'curry'}
+        )
+        self.assertWithinBudget(
+            'get', 'recipe:recipe-list', label='fields',
+            data={'fields': 'title'}
+        )
+        self.assertWithinBudget(
+            'get', 'recipe:recipe-detail', args=[self.recipe.id]
+        )
+        self.assertWithinBudget('get', 'recipe:recipe-export')
+
+    def test_sync(self):
+        """Test first and warm syncs"""
+        self.assertWithinBudget('get', 'recipe:sync')
+
+        self.user.refresh_from_db()
+        self.assertWithinBudget(
+            'get', 'recipe:sync', label='warm',
+            data={'cursor': self.user.sync_version}
+        )
+
+    def test_recipe_writes(self):
+        """Test creating, updating and deleting recipes"""
+        payload = {
+            'title': 'Thai curry',
+            'time_minutes': 30,
+            'price': '7.25',
+            'tags': [{'name': 'Vegan'}, {'name': 'Thai'}],
+            'ingredients': [{'name': 'Rice'}, {'name': 'Basil'}],
+        }
+        self.assertWithinBudget(
+            'post', 'recipe:recipe-list', data=payload, format='json',
+            status=status.HTTP_201_CREATED
+        )
+        self.assertWithinBudget(
+            'patch', 'recipe:recipe-detail', args=[self.recipe.id],
+            data={'tags': [{'name': 'Dinner'}]}, format='json'
+        )
+        self.assertWithinBudget(
+            'post', 'recipe:recipe-bulk', data=[payload] * 10, format='json',
+            status=status.HTTP_201_CREATED
+        )
+        self.assertWithinBudget(
+            'delete', 'recipe:recipe-detail', args=[self.recipe.id],
+            status=status.HTTP_204_NO_CONTENT
+        )
+
+    def test_recipe_image_upload(self):
+        """Test uploading a recipe image"""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+
+            self.assertWithinBudget(
+                'post', 'recipe:recipe-upload-image', args=[self.recipe.id],
+                data={'image': image_file}, format='multipart'
+            )
+
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def test_tag_and_ingredient_routes(self):
+        """Test reading, updating and deleting tags and ingredients"""
+        self.assertWithinBudget('get', 'recipe:tag-list')
+        self.assertWithinBudget(
+            'get', 'recipe:tag-list', label='counts',
+            data={'assigned_only': 1, 'with_counts': 1}
+        )
+        self.assertWithinBudget(
+            'get', 'recipe:tag-list', label='autocomplete', data={'q': 'cur'}
+        )
+        self.assertWithinBudget('get', 'recipe:ingredient-list')
+
+        for name, obj in [
+            ('tag', self.tags[0]),
+            ('ingredient', self.ingredients[0]),
+        ]:
+            self.assertWithinBudget(
+                'patch', f'recipe:{name}-detail', args=[obj.id],
+                data={'name': f'{obj.name} updated'}
+            )
+            self.assertWithinBudget(
+                'delete', f'recipe:{name}-detail', args=[obj.id],
+                status=status.HTTP_204_NO_CONTENT
+            )
@@ -1,30 +1,60 @@
 import tempfile
+import json
+import csv
 import os
+import io
+import time
+from datetime import timedelta
+from base64 import b64encode
+from urllib.parse import urlencode
 
 from PIL import Image
 from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, force_authenticate
 
 from core.models import Recipe, Tag, Ingredient
 
+from recipe.renditions import (
+    RENDITION_FORMATS,
+    RENDITION_SIZES,
+    delete_renditions,
+)
+from recipe.renderers import NDJSONRenderer
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.uploads import ImageTooLarge, ImageUploadHandler
+from recipe.views import RecipeViewSet
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
+
 
 def detail_url(recipe_id):
     """Create and return a recipe detail URL"""
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
+
 def image_upload_url(recipe_id):
     """Create and return an image upload URL"""
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
+
 def create_recipe(user, **params):
     """Create and return a sample recipe"""
     defaults = {
@@ -40,6 +70,14 @@ def create_recipe(user, **params):
     return recipe
 
 
+def response_json(response):
+    """Return the data of a response, read from its stream if streamed"""
+    if response.streaming:
+        return json.loads(b''.join(response.streaming_content))
+
+    return response.json()
+
+
 class PublicRecipeAPITests(TestCase):
     """Test unauthenticated API requests"""
 
@@ -75,7 +113,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is limited to authenticated user"""
@@ -92,7 +130,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test get recipe detail"""
@@ -172,7 +210,9 @@ class PrivateRecipeAPITests(TestCase):
         tags = Tag.objects.filter(user=self.user)
         self.assertEqual(tags.count(), 2)
 
-        exists = Tag.objects.filter(user=tag_breakfast.user, name=tag_breakfast.name).exists()
+        exists = Tag.objects.filter(
+            user=tag_breakfast.user, name=tag_breakfast.name
+        ).exists()
         self.assertTrue(exists)
 
     def test_create_tag_on_update(self):
@@ -226,7 +266,9 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(recipes[0].ingredients.count(), 1)
 
         for payload_ingredient in payload['ingredients']:
-            ingredient = Ingredient.objects.get(name=payload_ingredient['name'], user=self.user)
+            ingredient = Ingredient.objects.get(
+                name=payload_ingredient['name'], user=self.user
+            )
             self.assertIsNotNone(ingredient)
             self.assertIn(ingredient, recipes[0].ingredients.all())
 
@@ -261,7 +303,9 @@ class PrivateRecipeAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        ingredient = Ingredient.objects.get(user=self.user, name=payload['ingredients'][0]['name'])
+        ingredient = Ingredient.objects.get(
+            user=self.user, name=payload['ingredients'][0]['name']
+        )
         self.assertIsNotNone(ingredient)
         self.assertEqual(recipe.ingredients.count(), 1)
         self.assertIn(ingredient, recipe.ingredients.all())
@@ -286,6 +330,60 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(recipe.ingredients.count(), 1)
         self.assertIn(ingredient, recipe.ingredients.all())
 
+    def test_create_recipe_with_many_ingredients_batches_queries(self):
+        """Test nested ingredients are created with constant queries"""
+        Ingredient.objects.create(user=self.user, name='Ingredient 0')
+        payload = {
+            'title': 'Big Stew',
+            'time_minutes': 120,
+            'price': Decimal('20.00'),
+            'ingredients': [{'name': f'Ingredient {i}'} for i in range(30)]
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 30)
+        self.assertLess(len(queries), 15)
+
+    def test_update_tags_keeps_unchanged_links(self):
+        """Test updating tags only inserts and deletes changed links"""
+        recipe = create_recipe(user=self.user)
+        kept = Tag.objects.create(user=self.user, name='Kept')
+        removed = Tag.objects.create(user=self.user, name='Removed')
+        recipe.tags.add(kept, removed)
+        kept_link = Recipe.tags.through.objects.get(recipe=recipe, tag=kept)
+
+        payload = {'tags': [{'name': 'Kept'}, {'name': 'Added'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'Kept', 'Added'}
+        )
+        self.assertTrue(
+            Recipe.tags.through.objects.filter(id=kept_link.id).exists()
+        )
+        self.assertTrue(Tag.objects.filter(id=removed.id).exists())
+
+    def test_create_recipe_with_duplicate_tag_names(self):
+        """Test repeated tag names in payload create a single tag"""
+        payload = {
+            'title': 'Pad Thai',
+            'time_minutes': 20,
+            'price': Decimal('4.00'),
+            'tags': [{'name': 'Thai'}, {'name': 'Thai'}]
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_filter_by_tags(self):
         """Test filtering recipes by tags"""
         r1 = create_recipe(user=self.user, title='Thai Curry')
@@ -310,9 +408,9 @@ class PrivateRecipeAPITests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients"""
@@ -338,10 +436,1037 @@ class PrivateRecipeAPITests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_by_tags_returns_unique_recipes(self):
+        """Test recipe matching several tags is listed once"""
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Thai')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['id'], recipe.id)
+
+    def test_filter_by_all_tags(self):
+        """Test filtering recipes having all of the given tags"""
+        r1 = create_recipe(user=self.user, title='Thai Curry')
+        r2 = create_recipe(user=self.user, title='Thai Salad')
+        tag1 = Tag.objects.create(user=self.user, name='Thai')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        r1.tags.add(tag1, tag2)
+        r2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(RecipeSerializer(r1).data, res.data['results'])
+        self.assertNotIn(RecipeSerializer(r2).data, res.data['results'])
+
+    def test_filter_by_all_ingredients(self):
+        """Test filtering recipes having all of the given ingredients"""
+        r1 = create_recipe(user=self.user, title='Fried Rice')
+        r2 = create_recipe(user=self.user, title='Boiled Rice')
+        ing1 = Ingredient.objects.create(user=self.user, name='Rice')
+        ing2 = Ingredient.objects.create(user=self.user, name='Oil')
+        r1.ingredients.add(ing1, ing2)
+        r2.ingredients.add(ing1)
+
+        params = {'ingredients': f'{ing1.id},{ing2.id}', 'match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [r1.id])
+
+    def _create_recipe_with_relations(self, index):
+        """Create a recipe with a tag and an ingredient attached"""
+        recipe = create_recipe(user=self.user, title=f'Recipe {index}')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name=f'Tag {index}')
+        )
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name=f'Ingr {index}')
+        )
+
+        return recipe
+
+    def test_list_recipes_constant_query_count(self):
+        """Test listing recipes does not run queries per recipe"""
+        self._create_recipe_with_relations(0)
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(RECIPES_URL)
+
+        for index in range(1, 10):
+            self._create_recipe_with_relations(index)
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 10)
+        self.assertEqual(len(many), len(single))
+
+    def test_get_recipe_detail_prefetches_relations(self):
+        """Test recipe detail loads tags and ingredients in one query each"""
+        recipe = self._create_recipe_with_relations(0)
+        for index in range(1, 5):
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Extra {index}')
+            )
+
+        # ETag aggregate, recipe, tags and ingredients
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 5)
+
+    def test_list_recipes_paginated(self):
+        """Test following cursors through all pages of recipes"""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        pages = [res.data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+
+        ids = [item['id'] for page in pages for item in page['results']]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[1]['previous'])
+        self.assertEqual(previous.data['results'], pages[0]['results'])
+
+    def test_paginate_filtered_recipes(self):
+        """Test pagination keeps tags filter between pages"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        tagged = []
+        for _ in range(3):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(tag)
+            tagged.append(recipe)
+            create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'tags': tag.id, 'page_size': 2})
+        next_res = self.client.get(res.data['next'])
+
+        ids = [
+            item['id']
+            for item in res.data['results'] + next_res.data['results']
+        ]
+        self.assertEqual(ids, [recipe.id for recipe in reversed(tagged)])
+        self.assertIsNone(next_res.data['next'])
+
+    def test_pagination_seeks_without_offset(self):
+        """Test next pages are fetched by cursor instead of OFFSET"""
+        for _ in range(3):
+            create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL, {'page_size': 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(res.data['next'])
+
+        for query in queries:
+            self.assertNotIn('OFFSET', query['sql'].upper())
+
+    def test_invalid_cursor(self):
+        """Test invalid cursor returns not found"""
+        res = self.client.get(RECIPES_URL, {'cursor': 'invalid'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_invalid_values(self):
+        """Test cursors with values not matching the ordering are not found"""
+        cases = [
+            ({}, ['abc']),
+            ({}, [None]),
+            ({}, [{'a': 1}]),
+            ({}, [True]),
+            ({'search': 'soup'}, ['high', 1]),
+            ({'search': 'soup'}, [0.5, 1.5]),
+        ]
+        for params, position in cases:
+            cursor = b64encode(
+                urlencode({'p': json.dumps(position)}).encode()
+            ).decode()
+            res = self.client.get(RECIPES_URL, {**params, 'cursor': cursor})
+
+            self.assertEqual(
+                res.status_code, status.HTTP_404_NOT_FOUND, position
+            )
+
+
+class ConditionalRecipeAPITests(TestCase):
+    """Test ETag and Last-Modified handling of recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@test.test',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def assertNotModified(self, url, etag):
+        """Assert url answers 304 for etag with a single query"""
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def assertModified(self, url, etag):
+        """Assert url answers 200 with a new ETag"""
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+        return res['ETag']
+
+    def test_recipe_has_updated_at(self):
+        """Test saving a recipe moves updated_at forward"""
+        updated_at = self.recipe.updated_at
+        self.recipe.title = 'Changed'
+        self.recipe.save()
+
+        self.assertGreater(self.recipe.updated_at, updated_at)
+
+    def test_detail_conditional_get(self):
+        """Test unchanged recipe answers 304 and changes answer 200"""
+        url = detail_url(self.recipe.id)
+        res = self.client.get(url)
+        self.assertIn('Last-Modified', res)
+        etag = res['ETag']
+
+        self.assertNotModified(url, etag)
+
+        self.client.patch(url, {'title': 'New title'})
+        self.assertModified(url, etag)
+
+    def test_detail_etag_changes_with_links(self):
+        """Test adding, renaming and deleting tags changes the ETag"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        tag = Tag.objects.create(user=self.user, name='Thai')
+        self.recipe.tags.add(tag)
+        etag = self.assertModified(url, etag)
+
+        tag.name = 'Vietnamese'
+        tag.save()
+        etag = self.assertModified(url, etag)
+
+        tag.delete()
+        self.assertModified(url, etag)
+
+    def test_detail_etag_changes_with_reverse_links(self):
+        """Test linking from the tag side changes the ETag"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        tag = Tag.objects.create(user=self.user, name='Thai')
+        tag.recipe_set.add(self.recipe)
+        etag = self.assertModified(url, etag)
+
+        tag.recipe_set.clear()
+        self.assertModified(url, etag)
+
+    def test_list_conditional_get(self):
+        """Test unchanged list answers 304 and deletes answer 200"""
+        other = create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        self.assertNotModified(RECIPES_URL, etag)
+
+        other.delete()
+        self.assertModified(RECIPES_URL, etag)
+
+    def test_list_if_modified_since_after_delete(self):
+        """Test deleting an older recipe is not hidden by If-Modified-Since"""
+        older = create_recipe(user=self.user)
+        Recipe.objects.filter(pk=older.pk).update(
+            updated_at=self.recipe.updated_at - timedelta(days=1)
+        )
+        res = self.client.get(RECIPES_URL)
+        self.assertNotIn('Last-Modified', res)
+
+        older.delete()
+        res = self.client.get(
+            RECIPES_URL,
+            HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_validators_skip_recipes(self):
+        """Test lists are validated without reading the recipes"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertNotModified(RECIPES_URL, etag)
+
+        self.assertNotIn('core_recipe', queries[0]['sql'])
+
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Thai'))
+        self.assertModified(RECIPES_URL, etag)
+
+    def test_detail_not_found(self):
+        """Test missing recipe still answers 404"""
+        res = self.client.get(detail_url(self.recipe.id + 1000))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkRecipeAPITests(TestCase):
+    """Test creating many recipes in one request"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@test.test',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _payload(self, count, **params):
+        """Create a list of recipe payloads"""
+        return [
+            {
+                'title': f'Recipe {index}',
+                'time_minutes': 10,
+                'price': '2.50',
+                **params
+            }
+            for index in range(count)
+        ]
+
+    def test_bulk_create_recipes(self):
+        """Test creating recipes with tags and ingredients in bulk"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = self._payload(
+            3,
+            tags=[{'name': 'Vegan'}, {'name': 'Quick'}],
+            ingredients=[{'name': 'Rice'}]
+        )
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['errors'], [])
+        self.assertEqual(
+            [item['index'] for item in res.data['created']], [0, 1, 2]
+        )
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        for item in res.data['created']:
+            recipe = recipes.get(id=item['id'])
+            self.assertEqual(recipe.title, payload[item['index']]['title'])
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertEqual(recipe.ingredients.count(), 1)
+
+    def test_bulk_create_reports_indexed_errors(self):
+        """Test invalid items are reported by index and valid ones created"""
+        payload = self._payload(3)
+        payload[1]['time_minutes'] = 'slow'
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [item['index'] for item in res.data['created']], [0, 2]
+        )
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertIn('time_minutes', res.data['errors'][0]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_all_invalid(self):
+        """Test bulk request with no valid items fails"""
+        res = self.client.post(BULK_URL, [{'title': 'No time'}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test bulk request body must be a list"""
+        res = self.client.post(BULK_URL, self._payload(1)[0], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_from_ndjson(self):
+        """Test creating recipes from a NDJSON stream"""
+        lines = [json.dumps(item) for item in self._payload(2)]
+
+        res = self.client.post(
+            BULK_URL,
+            '\n'.join(lines) + '\n',
+            content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_constant_query_count(self):
+        """Test bulk create queries do not grow with the number of recipes"""
+        params = {
+            'tags': [{'name': 'Vegan'}],
+            'ingredients': [{'name': 'Rice'}],
+        }
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(
+                BULK_URL, self._payload(2, **params), format='json'
+            )
+        with CaptureQueriesContext(connection) as many:
+            self.client.post(
+                BULK_URL, self._payload(50, **params), format='json'
+            )
+
+        self.assertLessEqual(len(many), len(few))
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 52)
+
+    def test_bulk_create_refreshes_cached_tags(self):
+        """Test tags created in bulk show up in cached tag lists"""
+        tags_url = reverse('recipe:tag-list')
+        self.client.get(tags_url)
+
+        payload = self._payload(1, tags=[{'name': 'Vegan'}])
+        self.client.post(BULK_URL, payload, format='json')
+        res = self.client.get(tags_url)
+
+        self.assertEqual(
+            [item['name'] for item in res.data['results']], ['Vegan']
+        )
+
+
+class ExportRecipeAPITests(TestCase):
+    """Test streaming exports of recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@test.test',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _content(self, res):
+        """Return the joined streamed content as text"""
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as NDJSON"""
+        r1 = create_recipe(user=self.user, title='First')
+        r2 = create_recipe(user=self.user, title='Second')
+        r2.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'password123'
+        )
+        create_recipe(user=other_user)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in self._content(res).splitlines()]
+        self.assertEqual(rows, [
+            json.loads(json.dumps(RecipeSerializer(recipe).data))
+            for recipe in [r2, r1]
+        ])
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV"""
+        recipe = create_recipe(user=self.user, title='Curry, hot')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Thai'),
+            Tag.objects.create(user=self.user, name='Spicy')
+        )
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(self._content(res).splitlines()))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Curry, hot')
+        self.assertEqual(rows[0]['price'], '5.25')
+        self.assertEqual(set(rows[0]['tags'].split('|')), {'Thai', 'Spicy'})
+
+    def test_export_respects_filters(self):
+        """Test exporting only recipes matching tag filter"""
+        tagged = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        tagged.tags.add(tag)
+        create_recipe(user=self.user)
+
+        res = self.client.get(EXPORT_URL, {'tags': tag.id})
 
+        rows = [json.loads(line) for line in self._content(res).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [tagged.id])
+
+    def test_export_prefetches_per_chunk(self):
+        """Test export queries grow with chunks, not with recipes"""
+        for index in range(5):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'T{index}')
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            self._content(self.client.get(EXPORT_URL))
+
+        self.assertLessEqual(len(queries), 3)
+
+    async def _assert_streamed(self, response, recipes):
+        """Assert response sends rows before the export is read to its end"""
+        self.assertTrue(response.is_async)
+        content = aiter(response.streaming_content)
+
+        first = await anext(content)
+        self.assertLess(self.render_row.call_count, len(recipes))
+
+        lines = (first + b''.join([chunk async for chunk in content]))
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines.splitlines()],
+            [recipe.id for recipe in reversed(recipes)]
+        )
+
+    def _spy_render_row(self):
+        """Count the rows rendered into the export"""
+        spy = patch.object(
+            NDJSONRenderer, 'render_row',
+            autospec=True, side_effect=NDJSONRenderer.render_row
+        )
+        self.render_row = spy.start()
+        self.addCleanup(spy.stop)
+
+    @patch('recipe.async_views.STREAM_BATCH_SIZE', 1)
+    async def test_export_streamed_under_asgi(self):
+        """Test the sync export is not buffered under an ASGI server"""
+        recipes = [
+            await sync_to_async(create_recipe)(user=self.user)
+            for _ in range(5)
+        ]
+        token = await Token.objects.acreate(user=self.user)
+        self._spy_render_row()
+
+        res = await self.async_client.get(
+            EXPORT_URL, headers={'Authorization': f'Token {token.key}'}
+        )
+
+        await self._assert_streamed(res, recipes)
+
+    @override_settings(ASYNC_READ_VIEWS=True)
+    async def test_async_export_streamed(self):
+        """Test the async export reads recipes in chunks as it sends them"""
+        recipes = [
+            await sync_to_async(create_recipe)(user=self.user)
+            for _ in range(5)
+        ]
+        self._spy_render_row()
+        view = RecipeViewSet.as_view(
+            {'get': 'export'}, **RecipeViewSet.export.kwargs
+        )
+        request = AsyncRequestFactory().get(EXPORT_URL)
+        force_authenticate(request, user=self.user)
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            res = await view(request)
+            await self._assert_streamed(res, recipes)
+
+
+@override_settings(ASYNC_READ_VIEWS=True)
+class AsyncRecipeAPITests(TestCase):
+    """Test the async list and retrieve views of recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@test.test',
+            password='testpass123'
+        )
+        self.factory = AsyncRequestFactory()
+        self.list_view = RecipeViewSet.as_view(
+            {'get': 'list', 'post': 'create'}
+        )
+        self.detail_view = RecipeViewSet.as_view({'get': 'retrieve'})
+
+    async def _get(self, view, path, data=None, headers=None, **kwargs):
+        """Call view asynchronously as the user and render the response"""
+        request = self.factory.get(path, data, headers=headers)
+        force_authenticate(request, user=self.user)
+
+        response = await view(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+
+        return response
+
+    def test_async_views_only_when_enabled(self):
+        """Test async views are only built when enabled"""
+        self.assertTrue(iscoroutinefunction(self.list_view))
+
+        with override_settings(ASYNC_READ_VIEWS=False):
+            view = RecipeViewSet.as_view({'get': 'list'})
+
+        self.assertFalse(iscoroutinefunction(view))
+
+    async def test_async_list_matches_sync(self):
+        """Test the async list returns the same pages as the sync one"""
+        tag = await Tag.objects.acreate(user=self.user, name='Vegan')
+        for index in range(3):
+            recipe = await sync_to_async(create_recipe)(
+                user=self.user, title=f'Recipe {index}'
+            )
+            await recipe.tags.aadd(tag)
+
+        res = await self._get(
+            self.list_view, RECIPES_URL, data={'page_size': 2}
+        )
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        expected = await sync_to_async(client.get)(
+            RECIPES_URL, {'page_size': 2}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, expected.data)
+        self.assertEqual(res['ETag'], expected['ETag'])
+
+        res = await self._get(
+            self.list_view, RECIPES_URL, data={'page_size': 2},
+            headers={'If-None-Match': res['ETag']}
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_async_retrieve(self):
+        """Test retrieving a recipe asynchronously"""
+        recipe = await sync_to_async(create_recipe)(user=self.user)
+
+        res = await self._get(
+            self.detail_view, detail_url(recipe.id), pk=str(recipe.id)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], recipe.title)
+
+    async def test_async_retrieve_missing(self):
+        """Test missing and other users' recipes are not found"""
+        other = await sync_to_async(get_user_model().objects.create_user)(
+            'other@test.test', 'testpass123'
+        )
+        recipe = await sync_to_async(create_recipe)(user=other)
+
+        for pk in [str(recipe.id), 'abc']:
+            res = await self._get(self.detail_view, RECIPES_URL, pk=pk)
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_view_writes(self):
+        """Test other methods of async routes run the sync view"""
+        request = self.factory.post(
+            RECIPES_URL,
+            {'title': 'Soup', 'time_minutes': 5, 'price': '1.00'},
+            content_type='application/json'
+        )
+        force_authenticate(request, user=self.user)
+
+        response = await self.list_view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            await Recipe.objects.filter(user=self.user, title='Soup').aexists()
+        )
+
+
+class SearchRecipeAPITests(TestCase):
+    """Test full text search of recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@test.test',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text, **params):
+        """Return ids of recipes found by text"""
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_ranks_recipes(self):
+        """Test matches in titles rank above matches in descriptions"""
+        in_description = create_recipe(
+            user=self.user, title='Pasta', description='With roasted tomatoes'
+        )
+        in_title = create_recipe(user=self.user, title='Tomato soup')
+        create_recipe(user=self.user, title='Pancakes')
+        other_user = get_user_model().objects.create_user(
+            'other@test.test', 'pass123'
+        )
+        create_recipe(user=other_user, title='Tomato salad')
+
+        self.assertEqual(
+            self._search('tomato'), [in_title.id, in_description.id]
+        )
+
+    def test_search_tags_and_ingredients(self):
+        """Test searching names of linked tags and ingredients"""
+        recipe = create_recipe(user=self.user)
+        create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Blueberries')
+        )
+
+        self.assertEqual(self._search('breakfast'), [recipe.id])
+        self.assertEqual(self._search('blueberry'), [recipe.id])
+
+        tag.name = 'Brunch'
+        tag.save()
+        self.assertEqual(self._search('breakfast'), [])
+        self.assertEqual(self._search('brunch'), [recipe.id])
+
+        tag.delete()
+        self.assertEqual(self._search('brunch'), [])
+
+    def test_search_updated_recipe(self):
+        """Test search follows updates of the recipe text"""
+        recipe = create_recipe(user=self.user, title='Curry')
+
+        self.client.patch(detail_url(recipe.id), {'title': 'Stew'})
+
+        self.assertEqual(self._search('curry'), [])
+        self.assertEqual(self._search('stew'), [recipe.id])
+
+    def test_search_bulk_created_recipes(self):
+        """Test recipes created in bulk are searchable"""
+        payload = [
+            {'title': 'Lemon tart', 'time_minutes': 40, 'price': '4.00',
+             'tags': [{'name': 'Dessert'}]},
+            {'title': 'Fried rice', 'time_minutes': 15, 'price': '3.00'},
+        ]
+        self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(len(self._search('dessert')), 1)
+        self.assertEqual(len(self._search('rice')), 1)
+
+    def test_search_paginated_by_rank(self):
+        """Test paging through ranked results returns each recipe once"""
+        for index in range(5):
+            create_recipe(
+                user=self.user,
+                title='Bread ' * (index % 2 + 1),
+                description='bread'
+            )
+
+        res = self.client.get(RECIPES_URL, {'search': 'bread', 'page_size': 2})
+        ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(recipe['id'] for recipe in res.data['results'])
+
+        self.assertEqual(ids, self._search('bread', page_size=10))
+        self.assertEqual(len(set(ids)), 5)
+
+
+class ValuesListRecipeAPITests(TestCase):
+    """Test recipe lists built from values() rows match RecipeSerializer"""
+    mode = 'values'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.test',
+            'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Vegan', 'Dinner', 'Quick']
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ['Rice', 'Lime']
+        ]
+        for index in range(7):
+            recipe = create_recipe(
+                user=self.user,
+                title=f'Rice bowl {index}',
+                price=Decimal('4.5'),
+                link='' if index % 2 else 'https://example.com',
+                image_renditions={'thumb': {'webp': f'thumbs/{index}.webp'}}
+                if index % 3 == 0 else {},
+            )
+            # Linked one by one in reverse so links are not in id order
+            for tag in tags[index % 3:][::-1]:
+                recipe.tags.add(tag)
+            for ingredient in ingredients[:index % 3][::-1]:
+                recipe.ingredients.add(ingredient)
+
+    def _get_both(self, url, params=None):
+        """Return the list response of the tested and serializer modes"""
+        with override_settings(RECIPE_LIST_MODE=self.mode):
+            values = self.client.get(url, params)
+        with override_settings(RECIPE_LIST_MODE='serializer'):
+            serialized = self.client.get(url, params)
+
+        self.assertEqual(values.status_code, status.HTTP_200_OK)
+        return response_json(values), serialized.json()
+
+    def test_list_matches_serializer(self):
+        """Test every page and its links match RecipeSerializer's output"""
+        values, serialized = self._get_both(RECIPES_URL, {'page_size': 3})
+        self.assertEqual(values, serialized)
+        self.assertEqual(values['results'][0]['price'], '4.50')
+
+        values, serialized = self._get_both(values['next'])
+        self.assertEqual(values, serialized)
+        self.assertEqual(len(values['results']), 3)
+
+    def test_search_matches_serializer(self):
+        """Test pages of searches match RecipeSerializer's output"""
+        params = {'search': 'rice', 'page_size': 4}
+        values, serialized = self._get_both(RECIPES_URL, params)
+        self.assertEqual(values, serialized)
+
+        values, serialized = self._get_both(values['next'])
+        self.assertEqual(values, serialized)
+
+    def test_values_list_queries(self):
+        """Test a page is read with one query plus one per relation"""
+        with override_settings(RECIPE_LIST_MODE='values'), \
+                CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL)
+
+        # ETag validators, the page, tags and ingredients
+        self.assertEqual(len(queries), 4)
+
+    @override_settings(ASYNC_READ_VIEWS=True)
+    async def test_async_values_list(self):
+        """Test the async list builds the same output"""
+        request = AsyncRequestFactory().get(RECIPES_URL)
+        force_authenticate(request, user=self.user)
+
+        view = RecipeViewSet.as_view({'get': 'list'})
+        with override_settings(RECIPE_LIST_MODE=self.mode):
+            response = await view(request)
+            if response.streaming:
+                content = b''.join([chunk async for chunk in response])
+            else:
+                content = response.render().content
+
+        with override_settings(RECIPE_LIST_MODE='serializer'):
+            serialized = await sync_to_async(self.client.get)(RECIPES_URL)
+
+        self.assertEqual(json.loads(content), serialized.json())
+
+
+class JSONListRecipeAPITests(ValuesListRecipeAPITests):
+    """Test recipe lists built as JSON by Postgres match RecipeSerializer"""
+    mode = 'json'
+
+    def test_filters_match_serializer(self):
+        """Test lists filtered by tags and ingredients match"""
+        tag = Tag.objects.get(name='Vegan')
+        ingredient = Ingredient.objects.get(name='Lime')
+        for params in [
+            {'tags': f'{tag.id}'},
+            {'ingredients': f'{ingredient.id}'},
+            {'tags': f'{tag.id}', 'ingredients': f'{ingredient.id}'},
+        ]:
+            values, serialized = self._get_both(RECIPES_URL, params)
+            self.assertEqual(values, serialized)
+
+    def test_unicode_title(self):
+        """Test text is escaped like the JSON renderer does it"""
+        Recipe.objects.all().delete()
+        create_recipe(user=self.user, title='Crème\u2028"brûlée"\\')
+
+        with override_settings(RECIPE_LIST_MODE=self.mode):
+            res = self.client.get(RECIPES_URL)
+
+        content = b''.join(res.streaming_content)
+        self.assertNotIn('\u2028'.encode(), content)
+        self.assertEqual(
+            json.loads(content)['results'][0]['title'],
+            'Crème\u2028"brûlée"\\'
+        )
+
+    def test_empty_list(self):
+        """Test a list without recipes renders an empty page"""
+        Recipe.objects.all().delete()
+
+        values, serialized = self._get_both(RECIPES_URL)
+
+        self.assertEqual(values, serialized)
+        self.assertEqual(values['results'], [])
+
+    def test_previous_pages_match_serializer(self):
+        """Test pages reached through previous links match"""
+        values, _serialized = self._get_both(RECIPES_URL, {'page_size': 2})
+        values, _serialized = self._get_both(values['next'])
+        values, _serialized = self._get_both(values['next'])
+
+        values, serialized = self._get_both(values['previous'])
+        self.assertEqual(values, serialized)
+        self.assertEqual(len(values['results']), 2)
+
+        values, serialized = self._get_both(values['previous'])
+        self.assertEqual(values, serialized)
+        self.assertIsNone(values['previous'])
+
+    def test_list_streamed(self):
+        """Test the page is streamed instead of rendered at once"""
+        with override_settings(RECIPE_LIST_MODE=self.mode):
+            res = self.client.get(RECIPES_URL, {'page_size': 3})
+
+        self.assertTrue(res.streaming)
+        # The opening, a chunk per recipe and the closing with the links
+        self.assertEqual(len(list(res.streaming_content)), 5)
+
+    def test_not_acceptable(self):
+        """Test media types Postgres does not render are answered with 406"""
+        renderers = [JSONRenderer, BrowsableAPIRenderer]
+        with override_settings(RECIPE_LIST_MODE=self.mode), \
+                patch.object(RecipeViewSet, 'renderer_classes', renderers):
+            for accept in ['text/csv', 'text/html']:
+                res = self.client.get(RECIPES_URL, HTTP_ACCEPT=accept)
+
+                self.assertEqual(
+                    res.status_code, status.HTTP_406_NOT_ACCEPTABLE
+                )
+
+    def test_values_list_queries(self):
+        """Test a page and its related objects are read with one query"""
+        with override_settings(RECIPE_LIST_MODE=self.mode), \
+                CaptureQueriesContext(connection) as queries:
+            response_json(self.client.get(RECIPES_URL))
+
+        # ETag validators and the page
+        self.assertEqual(len(queries), 2)
+
+
+class SparseFieldsRecipeAPITests(TestCase):
+    """Test limiting recipe responses with fields and expand"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.test',
+            'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.recipe = create_recipe(user=self.user, title='Rice bowl')
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Rice')
+        )
+
+    def test_list_fields(self):
+        """Test lists return id and the requested fields in every mode"""
+        for mode in ['serializer', 'values', 'json']:
+            with self.subTest(mode=mode), \
+                    override_settings(RECIPE_LIST_MODE=mode):
+                res = self.client.get(RECIPES_URL, {'fields': 'title,tags'})
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                tag = self.recipe.tags.get()
+                self.assertEqual(response_json(res)['results'], [{
+                    'id': self.recipe.id,
+                    'title': 'Rice bowl',
+                    'tags': [{'id': tag.id, 'name': 'Vegan'}],
+                }])
+
+    def test_list_expand(self):
+        """Test expand limits the nested relations in every mode"""
+        for mode in ['serializer', 'values', 'json']:
+            with self.subTest(mode=mode), \
+                    override_settings(RECIPE_LIST_MODE=mode):
+                res = self.client.get(RECIPES_URL, {'expand': 'ingredients'})
+
+                recipe = response_json(res)['results'][0]
+                self.assertNotIn('tags', recipe)
+                self.assertEqual(recipe['ingredients'][0]['name'], 'Rice')
+                self.assertEqual(recipe['price'], '5.25')
+                self.assertEqual(recipe['image_renditions'], {})
+
+    def test_fields_skip_relations(self):
+        """Test relations that are not returned are not read"""
+        for mode in ['serializer', 'values', 'json']:
+            with self.subTest(mode=mode), \
+                    override_settings(RECIPE_LIST_MODE=mode), \
+                    CaptureQueriesContext(connection) as queries:
+                response_json(
+                    self.client.get(RECIPES_URL, {'fields': 'title'})
+                )
+
+            # ETag validators and the page
+            self.assertEqual(len(queries), 2)
+            self.assertNotIn('"description"', queries[-1]['sql'])
+            self.assertNotIn('"price"', queries[-1]['sql'])
+
+    def test_retrieve_fields(self):
+        """Test detail fields are returned when requested"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                detail_url(self.recipe.id), {'fields': 'description'}
+            )
+
+        self.assertEqual(
+            res.json(),
+            {'id': self.recipe.id, 'description': 'Sample description'}
+        )
+        self.assertNotIn('"title"', queries[-1]['sql'])
+
+    def test_invalid_fields(self):
+        """Test unknown fields and expansions are rejected"""
+        for params in [
+            {'fields': 'title,secret'},
+            {'fields': 'description'},
+            {'expand': 'title'},
+        ]:
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_writes_return_all_fields(self):
+        """Test fields do not limit what updates validate and return"""
+        url = detail_url(self.recipe.id) + '?fields=title'
+        res = self.client.patch(url, {'price': '6.00'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['price'], '6.00')
+        self.assertIn('description', res.data)
+
+    @override_settings(ASYNC_READ_VIEWS=True)
+    async def test_async_fields(self):
+        """Test the async views return the requested fields"""
+        url = detail_url(self.recipe.id)
+        request = AsyncRequestFactory().get(url, {'fields': 'title'})
+        force_authenticate(request, user=self.user)
+
+        view = RecipeViewSet.as_view({'get': 'retrieve'})
+        response = await view(request, pk=self.recipe.id)
+
+        self.assertEqual(
+            response.data, {'id': self.recipe.id, 'title': 'Rice bowl'}
+        )
 
 
 class ImageUploadTests(TestCase):
@@ -355,8 +1480,23 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        delete_renditions(self.recipe.image_renditions)
         self.recipe.image.delete()
 
+    def _upload(self, size=(10, 10)):
+        """Upload a JPEG image of size to the recipe"""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', size)
+            img.save(image_file, format='JPEG')
+            image_file.seek(0)
+
+            return self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': image_file},
+                format='multipart'
+            )
+
     def test_upload_image(self):
         """Test uploading an image to a recipe"""
         url = image_upload_url(self.recipe.id)
@@ -387,7 +1527,126 @@ class ImageUploadTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def _stored_images(self):
+        """Return names of the stored recipe images"""
+        path = self.recipe.image.storage.path(
+            os.path.join('uploads', 'recipe')
+        )
+        return set(os.listdir(path)) if os.path.isdir(path) else set()
+
+    def _upload_bytes(self, content, name='image.jpg'):
+        """Upload raw bytes as the recipe image"""
+        return self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': SimpleUploadedFile(name, content)},
+            format='multipart'
+        )
 
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1000)
+    def test_upload_image_too_large(self):
+        """Test images over the size limit are rejected while streaming"""
+        stored = self._stored_images()
+        img = Image.frombytes('RGB', (100, 100), os.urandom(30000))
+        content = io.BytesIO()
+        img.save(content, format='JPEG')
 
+        res = self._upload_bytes(content.getvalue())
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+        self.assertEqual(self._stored_images(), stored)
+
+    def test_upload_image_declared_too_large(self):
+        """Test bodies declaring more than the size limit are not read"""
+        handler = ImageUploadHandler()
+
+        with self.assertRaises(ImageTooLarge):
+            handler.handle_raw_input(None, {}, 2**40, b'boundary')
+
+    def test_upload_image_not_an_image(self):
+        """Test files without image magic bytes are rejected"""
+        stored = self._stored_images()
+
+        res = self._upload_bytes(b'not an image at all')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertEqual(self._stored_images(), stored)
 
+    def test_upload_image_truncated(self):
+        """Test images with a valid header but missing data are rejected"""
+        stored = self._stored_images()
+        img = Image.frombytes('RGB', (100, 100), os.urandom(30000))
+        content = io.BytesIO()
+        img.save(content, format='JPEG')
 
+        res = self._upload_bytes(content.getvalue()[:2000])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertEqual(self._stored_images(), stored)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100)
+    def test_upload_image_too_many_pixels(self):
+        """Test image dimensions are checked from the header"""
+        stored = self._stored_images()
+
+        res = self._upload(size=(20, 20))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertEqual(self._stored_images(), stored)
+
+    @override_settings(RECIPE_RENDITION_WORKERS=0)
+    def test_upload_image_creates_renditions(self):
+        """Test uploading an image creates resized renditions"""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload(size=(2000, 1000))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        renditions = self.recipe.image_renditions
+        self.assertEqual(set(renditions), set(RENDITION_SIZES))
+
+        for size, pixels in RENDITION_SIZES.items():
+            self.assertEqual(set(renditions[size]), set(RENDITION_FORMATS))
+            for name in renditions[size].values():
+                with Image.open(self.recipe.image.storage.path(name)) as image:
+                    self.assertEqual(image.size, (pixels, pixels // 2))
+
+        detail = self.client.get(detail_url(self.recipe.id))
+        url = detail.data['image_renditions']['thumb']['webp']
+        self.assertTrue(url.startswith('http://testserver/'))
+        self.assertTrue(url.endswith('.webp'))
+
+    @override_settings(RECIPE_RENDITION_WORKERS=0)
+    def test_upload_image_replaces_renditions(self):
+        """Test uploading a new image deletes renditions of the old one"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+        self.recipe.refresh_from_db()
+        old_image = self.recipe.image
+        old_path = old_image.storage.path(
+            self.recipe.image_renditions['thumb']['jpeg']
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+
+        self.assertFalse(os.path.exists(old_path))
+        old_image.delete(save=False)
+
+    @override_settings(RECIPE_RENDITION_WORKERS=2)
+    @patch('recipe.renditions._get_executor')
+    def test_upload_image_renders_in_worker_pool(self, patched_executor):
+        """Test renditions are created off the request thread"""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        patched_executor.return_value.submit.assert_called_once()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_renditions, {})
@@ -0,0 +1,123 @@
+"""
+Tests for the JSON renderer and parser of the recipe APIs
+"""
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from recipe.parsers import FastJSONParser
+from recipe.renderers import FastJSONRenderer
+
+
+SAMPLE = {
+    'price': Decimal('5.25'),
+    'created': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+    'title': gettext_lazy('Soup'),
+    'text': 'Line\u2028separator and ünïcode',
+    1: [True, None, 2**70],
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test rendering JSON with orjson"""
+
+    def test_matches_json_renderer(self):
+        """Test the output matches DRF's JSONRenderer"""
+        without_big_int = {**SAMPLE, 1: [True, None, 2]}
+        for data in [SAMPLE, without_big_int]:
+            self.assertEqual(
+                FastJSONRenderer().render(data),
+                JSONRenderer().render(data)
+            )
+
+    def test_fallback_without_orjson(self):
+        """Test the json module is used when orjson is missing"""
+        with patch('recipe.renderers.orjson', None):
+            rendered = FastJSONRenderer().render(SAMPLE)
+
+        self.assertEqual(rendered, JSONRenderer().render(SAMPLE))
+
+    def test_indent_requested(self):
+        """Test indented output requested by the client"""
+        rendered = FastJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=2'
+        )
+
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test parsing JSON with orjson"""
+
+    def test_parse(self):
+        """Test parsing a JSON body"""
+        data = FastJSONParser().parse(
+            io.BytesIO('{"title": "Käse", "price": 5.25}'.encode())
+        )
+
+        self.assertEqual(data, {'title': 'Käse', 'price': 5.25})
+
+    def test_parse_invalid(self):
+        """Test invalid JSON and NaN are rejected"""
+        for body in [b'{"title": ', b'{"price": NaN}']:
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(body))
+
+    def test_parse_other_encoding(self):
+        """Test bodies in other encodings are decoded first"""
+        data = FastJSONParser().parse(
+            io.BytesIO('{"title": "Käse"}'.encode('latin-1')),
+            parser_context={'encoding': 'latin-1'}
+        )
+
+        self.assertEqual(data, {'title': 'Käse'})
+
+    def test_fallback_without_orjson(self):
+        """Test the json module is used when orjson is missing"""
+        with patch('recipe.parsers.orjson', None):
+            data = FastJSONParser().parse(io.BytesIO(b'{"a": [1, 2]}'))
+
+        self.assertEqual(data, {'a': [1, 2]})
+
+
+class JSONNegotiationTests(TestCase):
+    """Test content negotiation of the API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.test',
+            'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_json_round_trip(self):
+        """Test recipes are created from and rendered as JSON"""
+        res = self.client.post(
+            reverse('recipe:recipe-list'),
+            {'title': 'Soup', 'time_minutes': 5, 'price': 5.25},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res.json()['price'], '5.25')
+
+    def test_browsable_api_disabled(self):
+        """Test HTML is not offered without DEBUG"""
+        res = self.client.get(
+            reverse('recipe:recipe-list'), HTTP_ACCEPT='text/html'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_406_NOT_ACCEPTABLE)
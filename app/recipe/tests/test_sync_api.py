@@ -0,0 +1,220 @@
+"""
+Tests for the sync API
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import routers
+from core.models import Change, Recipe, Tag, Ingredient
+from core.sync import changes_since
+
+
+SYNC_URL = reverse('recipe:sync')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicSyncAPITests(TestCase):
+    """Test unauthenticated sync requests"""
+
+    def test_auth_required(self):
+        """Test auth is required to sync"""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncAPITests(TestCase):
+    """Test syncing recipes, tags and ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.test',
+            'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Rice'
+        )
+        self.recipe = create_recipe(user=self.user, title='Rice bowl')
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def _sync(self, cursor=0, **params):
+        """Sync from cursor and return the response data"""
+        res = self.client.get(SYNC_URL, {'cursor': cursor, **params})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.json()
+
+    def test_first_sync(self):
+        """Test a first sync returns every object of the user"""
+        other_user = get_user_model().objects.create_user(
+            'other@test.test',
+            'testpass123'
+        )
+        create_recipe(user=other_user)
+
+        data = self._sync()
+
+        recipe = data['recipes']['changed'][0]
+        self.assertEqual(len(data['recipes']['changed']), 1)
+        self.assertEqual(recipe['title'], 'Rice bowl')
+        self.assertEqual(recipe['tags'], [self.tag.id])
+        self.assertEqual(recipe['ingredients'], [self.ingredient.id])
+        self.assertEqual(data['tags']['changed'][0]['name'], 'Vegan')
+        self.assertEqual(data['ingredients']['changed'][0]['name'], 'Rice')
+        self.assertFalse(data['more'])
+        self.user.refresh_from_db()
+        self.assertEqual(data['cursor'], self.user.sync_version)
+
+    def test_sync_changes_only(self):
+        """Test a sync returns only what changed since the cursor"""
+        cursor = self._sync()['cursor']
+        self.tag.name = 'Vegetarian'
+        self.tag.save()
+
+        data = self._sync(cursor)
+
+        self.assertEqual(data['recipes']['changed'], [])
+        self.assertEqual(data['ingredients']['changed'], [])
+        self.assertEqual(
+            [tag['name'] for tag in data['tags']['changed']], ['Vegetarian']
+        )
+        self.assertEqual(self._sync(data['cursor'])['tags']['changed'], [])
+
+    def test_link_changes(self):
+        """Test changing the links of a recipe syncs the recipe"""
+        cursor = self._sync()['cursor']
+        other_tag = Tag.objects.create(user=self.user, name='Quick')
+        self.recipe.tags.set([other_tag])
+
+        data = self._sync(cursor)
+
+        self.assertEqual(
+            data['recipes']['changed'][0]['tags'], [other_tag.id]
+        )
+        self.assertEqual(data['tags']['changed'][0]['id'], other_tag.id)
+
+    def test_deletions_leave_tombstones(self):
+        """Test deleted objects are returned by id"""
+        cursor = self._sync()['cursor']
+        other_recipe = create_recipe(user=self.user)
+        other_recipe_id, tag_id = other_recipe.id, self.tag.id
+        other_recipe.delete()
+        self.tag.delete()
+
+        data = self._sync(cursor)
+
+        self.assertEqual(data['recipes']['deleted'], [other_recipe_id])
+        self.assertEqual(data['tags']['deleted'], [tag_id])
+        # The recipe lost its link to the deleted tag
+        self.assertEqual(data['recipes']['changed'][0]['tags'], [])
+
+    def test_bulk_create_synced(self):
+        """Test recipes and tags created in bulk are synced"""
+        cursor = self._sync()['cursor']
+        res = self.client.post(BULK_URL, [
+            {
+                'title': f'Bulk {index}',
+                'time_minutes': 5,
+                'price': '1.00',
+                'tags': [{'name': 'Bulk'}],
+            }
+            for index in range(3)
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        data = self._sync(cursor)
+
+        self.assertEqual(len(data['recipes']['changed']), 3)
+        self.assertEqual(
+            [tag['name'] for tag in data['tags']['changed']], ['Bulk']
+        )
+
+    def test_limit(self):
+        """Test changes past the limit are left for the next sync"""
+        for index in range(4):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+
+        synced, cursor, more = [], 0, True
+        while more:
+            data = self._sync(cursor, limit=2)
+            changed = (
+                data['recipes']['changed'] + data['tags']['changed']
+                + data['ingredients']['changed']
+            )
+            self.assertLessEqual(len(changed), 2)
+            synced += changed
+            cursor, more = data['cursor'], data['more']
+
+        self.assertEqual(len(synced), 7)
+
+    def test_warm_sync_queries(self):
+        """Test a sync without changes reads only the change log"""
+        cursor = self._sync()['cursor']
+        for index in range(20):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+        cursor = self._sync(cursor)['cursor']
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self._sync(cursor)
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(data['cursor'], cursor)
+
+    def test_sync_reads_primary(self):
+        """Test the change log and the objects are read from the primary"""
+        routed = []
+
+        def read_changes(*args):
+            routed.append(routers.ReplicaRouter().db_for_read(Change))
+            return changes_since(*args)
+
+        connection_state = patch.object(
+            routers.connections['default'], 'in_atomic_block', False
+        )
+        with self.settings(REPLICA_DATABASES=['replica1']), \
+                patch('recipe.views.changes_since', read_changes), \
+                connection_state:
+            data = self._sync()
+
+        self.assertEqual(routed, ['default'])
+        self.assertEqual(len(data['recipes']['changed']), 1)
+
+    def test_invalid_params(self):
+        """Test invalid cursors and limits are rejected"""
+        for params in [{'cursor': -1}, {'cursor': 'x'}, {'limit': 0}]:
+            res = self.client.get(SYNC_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_delete_user(self):
+        """Test users are deleted with their change log"""
+        self.user.delete()
+        connection.check_constraints()
+
+        self.assertFalse(Change.objects.exists())
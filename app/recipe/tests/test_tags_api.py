@@ -1,11 +1,15 @@
 from decimal import Decimal
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.urls import reverse
-from django.test import TestCase
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, force_authenticate
 
 from core.models import (
     Tag,
@@ -13,13 +17,16 @@ from core.models import (
 )
 
 from recipe.serializers import TagSerializer
+from recipe.views import TagViewSet
 
 TAGS_URL = reverse('recipe:tag-list')
 
+
 def detail_url(tag_id):
     """Returns a url for getting tag detail"""
     return reverse('recipe:tag-detail', args=[tag_id])
 
+
 def create_user(email='user@test.test', password='testpass123'):
     """Creates and returns a user"""
     user = get_user_model().objects.create_user(
@@ -42,6 +49,7 @@ class PublicTagsAPITests(TestCase):
 
 class PrivateTagsAPITests(TestCase):
     def setUp(self):
+        cache.clear()
         self.user = create_user()
         self.client = APIClient()
 
@@ -63,7 +71,7 @@ class PrivateTagsAPITests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_update_tag_auth(self):
         """Tests updating a tag"""
@@ -76,6 +84,31 @@ class PrivateTagsAPITests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_to_taken_name(self):
+        """Test renaming a tag to a name the user already has fails"""
+        Tag.objects.create(user=self.user, name='Dessert')
+        tag = Tag.objects.create(user=self.user, name='After Dinner')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'After Dinner')
+
+    def test_update_tag_to_name_taken_concurrently(self):
+        """Test a name taken after the check fails like a taken name"""
+        Tag.objects.create(user=self.user, name='Dessert')
+        tag = Tag.objects.create(user=self.user, name='After Dinner')
+
+        # The other rename commits between the check and the update
+        with patch('django.db.models.QuerySet.exists', return_value=False):
+            res = self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'After Dinner')
+
     def test_delete_tag_auth(self):
         """Test deleting a tag"""
         tag = Tag.objects.create(user=self.user, name='Tag to delete')
@@ -103,8 +136,8 @@ class PrivateTagsAPITests(TestCase):
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_tags_unique(self):
         """Test filtered tags returns a unique list"""
@@ -126,5 +159,218 @@ class PrivateTagsAPITests(TestCase):
         recipe2.tags.add(tag)
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tag_cloud_single_query(self):
+        """Test assigned tags with their recipe counts cost one query"""
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Fast', 'Cheap', 'Unused']
+        ]
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                title=f'Recipe {index}',
+                time_minutes=5,
+                price=Decimal('3.00'),
+                user=self.user
+            )
+            recipe.tags.add(*tags[:1 if index else 2])
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                TAGS_URL, {'assigned_only': 1, 'with_counts': 1}
+            )
+
+        self.assertEqual(
+            [
+                (item['name'], item['recipe_count'])
+                for item in res.data['results']
+            ],
+            [('Fast', 3), ('Cheap', 1)]
+        )
+
+    def test_list_tags_without_counts(self):
+        """Test recipe counts are only listed when requested"""
+        Tag.objects.create(user=self.user, name='Fast')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('recipe_count', res.data['results'][0])
+
+    def test_tags_paginated_by_name(self):
+        """Test following cursors through tags ordered by name"""
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Fast', 'Cheap', 'Cheaper', 'Cheapest', 'Asian']
+        ]
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        ids = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [item['id'] for item in res.data['results']]
+
+        expected = [
+            tag.id for tag in sorted(
+                tags, key=lambda tag: (tag.name, tag.id), reverse=True
+            )
+        ]
+        self.assertEqual(ids, expected)
+
+    def test_tags_seek_with_row_comparison(self):
+        """Test pages after a cursor seek with one row comparison"""
+        for name in ['Fast', 'Cheap', 'Asian']:
+            Tag.objects.create(user=self.user, name=name)
+        res = self.client.get(TAGS_URL, {'page_size': 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(res.data['next'])
+        self.assertIn(
+            '("core_tag"."name", "core_tag"."id") < (', queries[-1]['sql']
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(res.data['previous'])
+        self.assertIn(
+            '("core_tag"."name", "core_tag"."id") > (', queries[-1]['sql']
+        )
+        self.assertEqual(res.data['results'][0]['name'], 'Fast')
+
+    def test_list_tags_served_from_cache(self):
+        """Test repeated list requests do not query the database"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegan')
+
+    def test_list_tags_cache_invalidated_on_change(self):
+        """Test creating, renaming and deleting tags refreshes the list"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        Tag.objects.create(user=self.user, name='Quick')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(TAGS_URL)
+        self.assertIn(
+            'Vegetarian', [item['name'] for item in res.data['results']]
+        )
+
+        tag.delete()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_assigned_only_cache_invalidated_on_link(self):
+        """Test assigning a tag to a recipe refreshes assigned_only lists"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            title='Salad',
+            time_minutes=5,
+            price=Decimal('3.00'),
+            user=self.user
+        )
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(res.data['results'], [])
+
+        recipe.tags.add(tag)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(len(res.data['results']), 1)
+
+        recipe.delete()
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(res.data['results'], [])
+
+    def test_list_tags_conditional_get(self):
+        """Test unchanged list is answered with 304 without queries"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(
+                TAGS_URL,
+                HTTP_IF_NONE_MATCH=res['ETag']
+            )
+        self.assertEqual(
+            not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+
+        Tag.objects.create(user=self.user, name='Quick')
+        modified = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(modified['ETag'], res['ETag'])
+
+    def test_list_tags_cache_per_user(self):
+        """Test cached lists are not shared between users"""
+        Tag.objects.create(user=self.user, name='Mine')
+        self.client.get(TAGS_URL)
+
+        other_user = create_user(email='other@test.test')
+        Tag.objects.create(user=other_user, name='Theirs')
+        self.client.force_authenticate(user=other_user)
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(
+            [item['name'] for item in res.data['results']], ['Theirs']
+        )
+
+
+@override_settings(ASYNC_READ_VIEWS=True)
+class AsyncTagsAPITests(TestCase):
+    """Test the async list view of tags"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.view = TagViewSet.as_view({'get': 'list'})
+
+    async def _list(self, **params):
+        """List tags asynchronously as the user"""
+        request = AsyncRequestFactory().get(TAGS_URL, params)
+        force_authenticate(request, user=self.user)
+
+        return (await self.view(request)).render()
+
+    async def test_async_list_tags(self):
+        """Test listing and autocompleting tags asynchronously"""
+        await Tag.objects.acreate(user=self.user, name='Vegan')
+        await Tag.objects.acreate(user=self.user, name='Vegetarian')
+        await Tag.objects.acreate(user=self.user, name='Dessert')
+
+        res = await self._list()
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Vegetarian', 'Vegan', 'Dessert']
+        )
+
+        res = await self._list(q='veg', with_counts=1)
+        self.assertEqual(
+            [
+                (tag['name'], tag['recipe_count'])
+                for tag in res.data['results']
+            ],
+            [('Vegan', 0), ('Vegetarian', 0)]
+        )
+
+    @patch('recipe.caching.set_cached_data', side_effect=AssertionError)
+    @patch('recipe.caching.get_cached_data', side_effect=AssertionError)
+    @patch('recipe.caching.get_version', side_effect=AssertionError)
+    async def test_async_list_uses_async_cache(self, *patched_sync):
+        """Test async lists are cached without blocking cache calls"""
+        tag = await Tag.objects.acreate(user=self.user, name='Vegan')
+
+        res = await self._list()
+        # Queryset updates skip the signals bumping the cached version
+        await Tag.objects.filter(pk=tag.pk).aupdate(name='Renamed')
+        cached = await self._list()
 
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(cached.data['results'][0]['name'], 'Vegan')
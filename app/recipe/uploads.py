@@ -0,0 +1,210 @@
+"""
+Streaming upload handling for recipe images
+"""
+import io
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.utils.translation import gettext_lazy as _
+
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.models import Recipe, recipe_image_file_path
+
+
+INVALID_IMAGE = _('Upload a valid JPEG, PNG, GIF or WebP image.')
+# Enough for the header of any image with a sane amount of metadata
+HEADER_MAX_BYTES = 256 * 2**10
+# Room for the multipart boundaries and the other form fields
+MULTIPART_OVERHEAD = 64 * 2**10
+IMAGE_FORMATS = ['JPEG', 'PNG', 'GIF', 'WEBP']
+
+
+class ImageTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Image is too large.')
+    default_code = 'image_too_large'
+
+
+def sniff_format(header: bytes) -> str | None:
+    """Returns the image format from the magic bytes of header"""
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'JPEG'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'PNG'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'GIF'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+
+    return None
+
+
+class StoredImage(UploadedFile):
+    """An uploaded image that was already written to its final storage"""
+
+    def __init__(
+        self, storage, storage_name, content_type, size, width, height
+    ):
+        super().__init__(
+            name=storage_name,
+            content_type=content_type,
+            size=size
+        )
+        self.storage = storage
+        self.storage_name = storage_name
+        self.width = width
+        self.height = height
+
+    def discard(self):
+        """Deletes the stored image"""
+        self.storage.delete(self.storage_name)
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """
+    Upload handler validating an image while it streams to storage
+
+    The body is rejected as soon as it exceeds RECIPE_IMAGE_MAX_BYTES and
+    the format and dimensions are read from the header before anything is
+    written. The chunks go to a temporary file kept in memory up to
+    FILE_UPLOAD_MAX_MEMORY_SIZE, the whole image is decoded once received
+    and only then saved to storage, so truncated or corrupt images never
+    reach it.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.storage = Recipe._meta.get_field('image').storage
+        self.max_bytes = settings.RECIPE_IMAGE_MAX_BYTES
+        self.max_pixels = settings.RECIPE_IMAGE_MAX_PIXELS
+        self.stored = None
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        """Rejects bodies declaring more than the allowed size"""
+        if content_length > self.max_bytes + MULTIPART_OVERHEAD:
+            raise ImageTooLarge()
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        """Starts sniffing the header of the image field"""
+        if field_name != 'image' or self.stored is not None:
+            raise SkipFile()
+
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.header = b''
+        self.image_size = None
+        self.file = None
+
+    def receive_data_chunk(self, raw_data, start):
+        """Buffers the header, then writes chunks straight to storage"""
+        if start + len(raw_data) > self.max_bytes:
+            self._close()
+            raise ImageTooLarge()
+
+        if self.file is not None:
+            self.file.write(raw_data)
+            return None
+
+        self.header += raw_data
+        if self._read_header(complete=False):
+            self._open_file()
+            self.file.write(self.header)
+            self.header = b''
+
+        return None
+
+    def file_complete(self, file_size):
+        """Returns the stored image once the whole file was received"""
+        if self.file is None:
+            self._read_header(complete=True)
+            self._open_file()
+            self.file.write(self.header)
+
+        self._decode()
+        self.file.seek(0)
+        name = self.storage.generate_filename(
+            recipe_image_file_path(None, self.file_name)
+        )
+        self.storage_name = self.storage.save(name, File(self.file))
+        self._close()
+
+        width, height = self.image_size
+        self.stored = StoredImage(
+            self.storage,
+            self.storage_name,
+            self.content_type,
+            file_size,
+            width,
+            height
+        )
+        return self.stored
+
+    def upload_interrupted(self):
+        """Drops the partially received image"""
+        self._close()
+
+    def _read_header(self, complete: bool) -> bool:
+        """Validates format and dimensions once the header was received"""
+        image_format = sniff_format(self.header[:12])
+        if len(self.header) >= 12 and image_format not in IMAGE_FORMATS:
+            self._invalid(INVALID_IMAGE)
+
+        try:
+            # Opening only parses the header, pixels are never decoded here
+            with Image.open(io.BytesIO(self.header)) as image:
+                opened_format, size = image.format, image.size
+        except Image.DecompressionBombError:
+            self._invalid(_('Image dimensions are too large.'))
+        except OSError:
+            if complete or len(self.header) > HEADER_MAX_BYTES:
+                self._invalid(INVALID_IMAGE)
+            return False
+
+        if opened_format != image_format:
+            self._invalid(INVALID_IMAGE)
+        if size[0] * size[1] > self.max_pixels:
+            self._invalid(_('Image dimensions are too large.'))
+
+        self.image_size = size
+        return True
+
+    def _decode(self):
+        """Decodes the received image, rejecting truncated or corrupt ones"""
+        try:
+            self.file.seek(0)
+            with Image.open(self.file) as image:
+                image.verify()
+
+            self.file.seek(0)
+            with Image.open(self.file) as image:
+                # JPEGs are decoded scaled down, which still reads all data
+                image.draft(image.mode, (1, 1))
+                image.load()
+        except Exception:
+            self._invalid(INVALID_IMAGE)
+
+    def _open_file(self):
+        """Opens the temporary file the image is received into"""
+        self.file = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+            dir=settings.FILE_UPLOAD_TEMP_DIR
+        )
+
+    def _close(self):
+        """Closes and drops the temporary file"""
+        if getattr(self, 'file', None) is not None:
+            self.file.close()
+            self.file = None
+
+    def _invalid(self, message):
+        """Rejects the upload with a validation error for the image"""
+        self._close()
+        raise ValidationError({'image': [message]})
@@ -5,22 +5,78 @@ from drf_spectacular.utils import (
     OpenApiTypes
 )
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.utils.translation import gettext as _
+
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotAcceptable, ValidationError
 from rest_framework.response import Response
-from rest_framework.mixins import ListModelMixin, UpdateModelMixin, DestroyModelMixin
+from rest_framework.mixins import (
+    ListModelMixin,
+    UpdateModelMixin,
+    DestroyModelMixin
+)
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
 
+from core.authentication import CachedTokenAuthentication
 from core.models import Recipe, Tag, Ingredient
+from core.routers import ReadYourWritesMixin, primary
+from core.sync import changes_since
 from .serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
+    RecipeJSONSerializer,
+    RecipeValuesSerializer,
     TagSerializer,
     IngredientSerializer,
-    RecipeImageSerializer
+    RecipeImageSerializer,
+    SyncQuerySerializer,
+    SyncSerializer,
+)
+from . import caching
+from .async_views import AsyncReadMixin, stream_content
+from .parsers import FastJSONParser, NDJSONParser
+from .renderers import NDJSONRenderer, CSVRenderer
+from .renditions import schedule_renditions
+from .uploads import ImageUploadHandler
+from .pagination import (
+    KeysetPagination,
+    NameKeysetPagination,
+    RankKeysetPagination,
 )
+from .querysets import (
+    RecipeQuerysetBuilder,
+    autocomplete,
+    filter_assigned,
+    filter_by_related,
+    recipe_count,
+)
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of the fields to return, id is '
+                    'always returned. Columns and tags or ingredients that '
+                    'are not returned are not read'
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description='Comma separated list of the related objects to nest, '
+                    'tags and ingredients. Both are nested unless fields or '
+                    'expand are given'
+    ),
+]
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -34,62 +90,494 @@ from .serializers import (
                 'ingredients',
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredients IDs to filter'
-            )
+            ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=['any', 'all'],
+                description='Match recipes having any (default) or all of '
+                            'the given tags and ingredients'
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Full text search in titles, descriptions, tags '
+                            'and ingredients, results are ordered by rank. '
+                            'Supports "quoted phrases", OR and -exclusions'
+            ),
+            *SPARSE_FIELDS_PARAMETERS
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS)
 )
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(AsyncReadMixin, ReadYourWritesMixin, ModelViewSet):
     """View for manage recipe APIs"""
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    bulk_max_items = 10000
+    export_chunk_size = 2000
+    sparse_fields_actions = ['list', 'retrieve']
 
     def _params_to_ints(self, qs: str) -> list[int]:
         """Convert a list of strings to integers"""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _params_to_names(self, qs: str) -> list[str]:
+        """Convert a comma separated list to names"""
+        return [name.strip() for name in qs.split(',') if name.strip()]
+
+    def _get_fields(self) -> list[str] | None:
+        """
+        Return the fields requested with fields and expand, None for all
+
+        Only read actions return sparse fieldsets, writes validate all of
+        their fields.
+        """
+        if not hasattr(self, '_fields'):
+            self._fields = self._parse_fields()
+
+        return self._fields
+
+    def _parse_fields(self) -> list[str] | None:
+        """Parse and validate the fields and expand parameters"""
+        params = self.request.query_params
+        if self.action not in self.sparse_fields_actions or (
+            'fields' not in params and 'expand' not in params
+        ):
+            return None
+
+        available = self.get_serializer_class().Meta.fields
+        related = RecipeQuerysetBuilder.RELATED_FIELDS
+        expand = self._params_to_names(params.get('expand', ''))
+        if 'fields' in params:
+            fields = self._params_to_names(params['fields'])
+        else:
+            fields = [name for name in available if name not in related]
+
+        unknown = set(fields) - set(available)
+        if unknown:
+            raise ValidationError({
+                'fields': _('Unknown fields: %s.') % ', '.join(sorted(unknown))
+            })
+
+        if set(expand) - set(related):
+            raise ValidationError({
+                'expand': _('Only %s can be expanded.') % ', '.join(related)
+            })
+
+        requested = {'id', *fields, *expand}
+        return [name for name in available if name in requested]
+
+    def _get_search(self) -> str:
+        """Return the full text search of the request"""
+        return self.request.query_params.get('search', '').strip()
+
+    @property
+    def paginator(self):
+        """Return the paginator, paging searches by rank"""
+        if not hasattr(self, '_paginator') and self._get_search():
+            self._paginator = RankKeysetPagination()
+
+        return super().paginator
+
     def get_queryset(self):
         """Retrieve recipes for authenticated user"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
-        filters = {
-            'user': self.request.user
-        }
+        match_all = self.request.query_params.get('match') == 'all'
+        queryset = self.queryset.filter(user=self.request.user)
 
         if tags:
             tags_ids = self._params_to_ints(tags)
-            filters['tags__id__in'] = tags_ids
+            queryset = filter_by_related(queryset, 'tags', tags_ids, match_all)
 
         if ingredients:
             ingredients_ids = self._params_to_ints(ingredients)
-            filters['ingredients__id__in'] = ingredients_ids
+            queryset = filter_by_related(
+                queryset, 'ingredients', ingredients_ids, match_all
+            )
+
+        search = self._get_search()
+        if search:
+            queryset = queryset.search(search).order_by('-rank', '-id')
+        else:
+            queryset = queryset.order_by('-id')
 
-        return self.queryset.filter(**filters).order_by('-id').distinct()
+        return RecipeQuerysetBuilder(
+            queryset, self.action, self._get_fields()
+        ).build()
 
     def get_serializer_class(self):
         """Return the serializer class for request"""
-        if self.action == 'list':
+        if self.action in ('list', 'export'):
             return RecipeSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
 
         return self.serializer_class
 
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, limited to the requested fields"""
+        fields = self._get_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+
+        return super().get_serializer(*args, **kwargs)
+
+    def _validator_aggregates(self) -> dict:
+        """Returns aggregates the ETag and Last-Modified are built from"""
+        return {'updated_at': Max('updated_at'), 'count': Count('id')}
+
+    def _validators(self, queryset) -> tuple[str, int | None]:
+        """Returns ETag and Last-Modified of the recipes in queryset"""
+        return self._validators_from_state(
+            queryset.order_by().aggregate(**self._validator_aggregates())
+        )
+
+    async def _avalidators(self, queryset) -> tuple[str, int | None]:
+        """Returns ETag and Last-Modified of the recipes in queryset"""
+        aggregates = self._validator_aggregates()
+        return self._validators_from_state(
+            await queryset.order_by().aaggregate(**aggregates)
+        )
+
+    def _validators_from_state(self, state: dict) -> tuple[str, int | None]:
+        """Returns ETag and Last-Modified from the aggregated recipes"""
+        updated_at = state['updated_at']
+
+        etag = caching.make_etag(
+            f'{self.request.build_absolute_uri()}:{state["count"]}:'
+            f'{updated_at.isoformat() if updated_at else ""}'
+        )
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+
+        return etag, last_modified
+
+    def _sync_version(self):
+        """Returns a queryset of the sync version of the user"""
+        return get_user_model().objects.filter(
+            pk=self.request.user.pk
+        ).values_list('sync_version', flat=True)
+
+    def _list_etag(self, sync_version: int | None) -> str:
+        """
+        Returns the ETag of recipe lists at the sync version of the user
+
+        Every change of the user's recipes, tags, ingredients and their
+        links advances the version, so lists are validated with a primary
+        key lookup instead of scanning the user's recipes.
+        """
+        return caching.make_etag(
+            f'{self.request.build_absolute_uri()}:{sync_version}'
+        )
+
+    def _list_rows(self, serializer_class, queryset):
+        """Returns the serializer and rows of the values() list modes"""
+        serializer = serializer_class(self.request, self._get_fields())
+        # Rank orders the pages of searches
+        extra_fields = ['rank'] if self._get_search() else []
+
+        return serializer, serializer.values(
+            self.filter_queryset(queryset), *extra_fields
+        )
+
+    def _values_list(self, queryset):
+        """Lists recipes from values() rows, see RecipeValuesSerializer"""
+        serializer, rows = self._list_rows(RecipeValuesSerializer, queryset)
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(serializer.to_representation(list(rows)))
+
+        return self.get_paginated_response(serializer.to_representation(page))
+
+    async def _avalues_list(self, queryset):
+        """Lists recipes from values() rows without blocking"""
+        serializer, rows = self._list_rows(RecipeValuesSerializer, queryset)
+        page = await self.paginator.apaginate_queryset(
+            rows, self.request, view=self
+        )
+        if page is None:
+            return Response(
+                await serializer.ato_representation([r async for r in rows])
+            )
+
+        return self.get_paginated_response(
+            await serializer.ato_representation(page)
+        )
+
+    def _check_json_accepted(self):
+        """Answers 406 unless the negotiated renderer renders JSON"""
+        if not isinstance(self.request.accepted_renderer, JSONRenderer):
+            # Postgres only renders JSON, e.g. not the browsable API
+            raise NotAcceptable(available_renderers=[
+                renderer for renderer in self.get_renderers()
+                if isinstance(renderer, JSONRenderer)
+            ])
+
+    def _json_response(self, content) -> StreamingHttpResponse:
+        """Streams JSON rendered by Postgres"""
+        return StreamingHttpResponse(
+            stream_content(self.request, content),
+            content_type='application/json'
+        )
+
+    def _json_list(self, queryset):
+        """Lists recipes rendered by Postgres, see RecipeJSONSerializer"""
+        self._check_json_accepted()
+        serializer, rows = self._list_rows(RecipeJSONSerializer, queryset)
+        rows = self._streamed(rows)
+        page = self.paginator.stream_queryset(rows, self.request, view=self)
+        if page is None:
+            return self._json_response(serializer.stream(rows.iterator()))
+
+        return self._json_response(
+            serializer.stream_page(page, self.paginator)
+        )
+
+    async def _ajson_list(self, queryset):
+        """Lists recipes rendered by Postgres without blocking"""
+        self._check_json_accepted()
+        serializer, rows = self._list_rows(RecipeJSONSerializer, queryset)
+        rows = self._streamed(rows)
+        page = await self.paginator.astream_queryset(
+            rows, self.request, view=self
+        )
+        if page is None:
+            return self._json_response(serializer.astream(rows.aiterator()))
+
+        return self._json_response(
+            serializer.astream_page(page, self.paginator)
+        )
+
+    def list(self, request, *args, **kwargs):
+        """
+        List recipes, answering 304 when none changed
+
+        Lists have no Last-Modified, their ETag is built from the sync
+        version of the user, see _list_etag().
+        """
+        queryset = self.get_queryset()
+        etag = self._list_etag(self._sync_version().first())
+
+        response = caching.not_modified(request, etag)
+        if response is None and settings.RECIPE_LIST_MODE == 'values':
+            response = self._values_list(queryset)
+        elif response is None and settings.RECIPE_LIST_MODE == 'json':
+            response = self._json_list(queryset)
+        elif response is None:
+            response = super().list(request, *args, **kwargs)
+
+        caching.set_validators(response, etag)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, answering 304 when it did not change"""
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.get_queryset().filter(pk=kwargs[lookup])
+        except (TypeError, ValueError):
+            return super().retrieve(request, *args, **kwargs)
+
+        etag, last_modified = self._validators(queryset)
+        if last_modified is None:
+            # No such recipe, let retrieve answer with 404
+            return super().retrieve(request, *args, **kwargs)
+
+        response = caching.not_modified(request, etag, last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+
+        caching.set_validators(response, etag, last_modified)
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        """List recipes, answering 304 when none changed"""
+        queryset = self.get_queryset()
+        etag = self._list_etag(await self._sync_version().afirst())
+
+        response = caching.not_modified(request, etag)
+        if response is None and settings.RECIPE_LIST_MODE == 'values':
+            response = await self._avalues_list(queryset)
+        elif response is None and settings.RECIPE_LIST_MODE == 'json':
+            response = await self._ajson_list(queryset)
+        elif response is None:
+            page = await self.paginator.apaginate_queryset(
+                queryset, request, view=self
+            )
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+
+        caching.set_validators(response, etag)
+        return response
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, answering 304 when it did not change"""
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.get_queryset().filter(pk=kwargs[lookup])
+            etag, last_modified = await self._avalidators(queryset)
+        except (TypeError, ValueError):
+            raise Http404
+
+        if last_modified is None:
+            raise Http404
+
+        response = caching.not_modified(request, etag, last_modified)
+        if response is None:
+            instance = await queryset.afirst()
+            if instance is None:
+                raise Http404
+            self.check_object_permissions(request, instance)
+            response = Response(self.get_serializer(instance).data)
+
+        caching.set_validators(response, etag, last_modified)
+        return response
+
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        request=RecipeDetailSerializer(many=True),
+        responses={
+            201: OpenApiTypes.OBJECT,
+            207: OpenApiTypes.OBJECT,
+            400: OpenApiTypes.OBJECT
+        }
+    )
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='bulk',
+        parser_classes=[FastJSONParser, NDJSONParser]
+    )
+    def bulk(self, request):
+        """Create many recipes from a JSON list or a NDJSON stream"""
+        if not isinstance(request.data, list):
+            return Response(
+                {'detail': _('Expected a list of recipes.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(request.data) > self.bulk_max_items:
+            return Response(
+                {
+                    'detail': _('Send at most %d recipes at once.')
+                    % self.bulk_max_items
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        valid, errors = serializer.validate_items()
+        recipes = []
+        if valid:
+            recipes = serializer.create([data for _index, data in valid])
+
+        created = [
+            {'index': index, 'id': recipe.id}
+            for (index, _data), recipe in zip(valid, recipes)
+        ]
+
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response(
+            {'created': created, 'errors': errors},
+            status=response_status
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'format',
+                OpenApiTypes.STR, enum=['ndjson', 'csv'],
+                description='Export format, NDJSON by default'
+            )
+        ],
+        responses={
+            (200, NDJSONRenderer.media_type): OpenApiTypes.STR,
+            (200, CSVRenderer.media_type): OpenApiTypes.STR
+        }
+    )
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='export',
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+        pagination_class=None
+    )
+    def export(self, request):
+        """Stream all recipes of the user as NDJSON or CSV"""
+        queryset = self._streamed(self.get_queryset())
+        serializer = self.get_serializer()
+        rows = (
+            serializer.to_representation(recipe)
+            for recipe in queryset.iterator(chunk_size=self.export_chunk_size)
+        )
+
+        return self._export_response(request.accepted_renderer.render_stream(
+            rows, list(serializer.fields)
+        ))
+
+    async def aexport(self, request):
+        """Stream all recipes of the user without blocking"""
+        queryset = self._streamed(self.get_queryset())
+        serializer = self.get_serializer()
+        rows = (
+            serializer.to_representation(recipe)
+            async for recipe in queryset.aiterator(
+                chunk_size=self.export_chunk_size
+            )
+        )
+
+        return self._export_response(request.accepted_renderer.arender_stream(
+            rows, list(serializer.fields)
+        ))
+
+    def _streamed(self, queryset):
+        """
+        Returns queryset bound to the database reads of the request use
+
+        Streamed rows are read after the request's routing ended.
+        """
+        return queryset.using(queryset.db)
+
+    def _export_response(self, content) -> StreamingHttpResponse:
+        """Returns the streamed export rendered by the accepted renderer"""
+        renderer = self.request.accepted_renderer
+        response = StreamingHttpResponse(
+            stream_content(self.request, content),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to recipe"""
         recipe = self.get_object()
+        stale_renditions = recipe.image_renditions
+        request.upload_handlers = [ImageUploadHandler(request)]
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(image_renditions={})
+            schedule_renditions(recipe.id, recipe.image.name, stale_renditions)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
+        for upload in request.FILES.getlist('image'):
+            upload.discard()
+
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -100,29 +588,158 @@ class RecipeViewSet(ModelViewSet):
                 'assigned_only',
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to recipes'
+            ),
+            OpenApiParameter(
+                'with_counts',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Include the number of recipes using each item '
+                            'as recipe_count'
+            ),
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Autocomplete names starting with or similar to '
+                            'q. Returns a single page of the best matches '
+                            'with their recipe_count'
             )
         ]
     )
 )
-class BaseRecipeAttrViewSet(DestroyModelMixin, UpdateModelMixin, ListModelMixin, GenericViewSet):
+class BaseRecipeAttrViewSet(
+    AsyncReadMixin,
+    ReadYourWritesMixin,
+    DestroyModelMixin,
+    UpdateModelMixin,
+    ListModelMixin,
+    GenericViewSet
+):
     """Manage recipe attributes in the database"""
     queryset = []
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = NameKeysetPagination
+    autocomplete_limit = 20
 
     def get_queryset(self):
         """Retrieve tags for auth user"""
-        filters = {
-            'user': self.request.user,
-        }
+        queryset = self.queryset.filter(user=self.request.user)
         is_assigned_only = bool(
                 int(self.request.query_params.get('assigned_only', 0))
         )
+        with_counts = bool(
+                int(self.request.query_params.get('with_counts', 0))
+        )
 
         if is_assigned_only:
-            filters['recipe__isnull'] = False
+            queryset = filter_assigned(queryset)
+
+        if with_counts and self.action == 'list':
+            queryset = queryset.annotate(
+                recipe_count=recipe_count(queryset.model)
+            )
 
-        return self.queryset.filter(**filters).order_by('-name').distinct()
+        return queryset.order_by('-name')
+
+    def _cache_validators(
+        self, request, version: int
+    ) -> tuple[str, str, int]:
+        """Returns the cache key, ETag and Last-Modified of the listing"""
+        key = caching.response_cache_key(
+            request,
+            f'recipe-attrs:{self.queryset.model._meta.model_name}',
+            version
+        )
+
+        return key, caching.make_etag(key), version // 10**9
+
+    def list(self, request, *args, **kwargs):
+        """List objects, served from the per user cache while unchanged"""
+        key, etag, last_modified = self._cache_validators(
+            request, caching.get_version(request.user.pk)
+        )
+
+        response = caching.not_modified(request, etag, last_modified)
+        if response is None:
+            data = caching.get_cached_data(key)
+            if data is None:
+                data = self._list_data(request, *args, **kwargs)
+                caching.set_cached_data(key, data)
+            response = Response(data)
+
+        caching.set_validators(response, etag, last_modified)
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        """List objects, served from the per user cache while unchanged"""
+        key, etag, last_modified = self._cache_validators(
+            request, await caching.aget_version(request.user.pk)
+        )
+
+        response = caching.not_modified(request, etag, last_modified)
+        if response is None:
+            data = await caching.aget_cached_data(key)
+            if data is None:
+                data = await self._alist_data(request)
+                await caching.aset_cached_data(key, data)
+            response = Response(data)
+
+        caching.set_validators(response, etag, last_modified)
+        return response
+
+    def _list_data(self, request, *args, **kwargs):
+        """Return the listed page, or the best matches when autocompleting"""
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return super().list(request, *args, **kwargs).data
+
+        queryset = autocomplete(
+            self.get_queryset(), text, self.autocomplete_limit
+        )
+        serializer = self.get_serializer(queryset, many=True)
+
+        return {'next': None, 'previous': None, 'results': serializer.data}
+
+    async def _alist_data(self, request):
+        """Return the listed page, or the best matches when autocompleting"""
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            page = await self.paginator.apaginate_queryset(
+                self.get_queryset(), request, view=self
+            )
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data).data
+
+        queryset = autocomplete(
+            self.get_queryset(), text, self.autocomplete_limit
+        )
+        serializer = self.get_serializer(
+            [obj async for obj in queryset], many=True
+        )
+
+        return {'next': None, 'previous': None, 'results': serializer.data}
+
+    def perform_update(self, serializer):
+        """Update the object keeping names unique for the user"""
+        name = serializer.validated_data.get('name')
+        name_taken_error = ValidationError(
+            {'name': _('This name is already in use.')}
+        )
+
+        if name is not None:
+            name_taken = self.queryset.filter(
+                user=self.request.user,
+                name=name
+            ).exclude(pk=serializer.instance.pk).exists()
+
+            if name_taken:
+                raise name_taken_error
+
+        # A concurrent rename can take the name after the check
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise name_taken_error
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -135,3 +752,65 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in database"""
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
+
+
+class SyncView(APIView):
+    """
+    Changes of the user's recipes, tags and ingredients for offline clients
+
+    Reads the change log from the cursor on, so syncing costs the number
+    of changes since the last sync, not the number of objects. Everything
+    is read from the primary, a replica lagging behind the change log would
+    miss objects whose changes the cursor already moved past.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(parameters=[SyncQuerySerializer], responses=SyncSerializer)
+    def get(self, request):
+        """Return objects changed and ids of objects deleted since cursor"""
+        params = SyncQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        with primary():
+            return Response(self._sync(request, **params.validated_data))
+
+    def _sync(self, request, cursor: int, limit: int) -> dict:
+        """Returns the changes since cursor, up to limit of them"""
+        changes, cursor, more = changes_since(
+            request.user.pk, cursor, limit
+        )
+        recipes = Recipe.objects.filter(
+            user=request.user, pk__in=changes['recipe']['changed']
+        ).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id').order_by('id')),
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only('id').order_by('id')
+            ),
+        )
+        tags = Tag.objects.filter(
+            user=request.user, pk__in=changes['tag']['changed']
+        )
+        ingredients = Ingredient.objects.filter(
+            user=request.user, pk__in=changes['ingredient']['changed']
+        )
+
+        serializer = SyncSerializer({
+            'cursor': cursor,
+            'more': more,
+            'recipes': {
+                'changed': recipes.order_by('id'),
+                'deleted': changes['recipe']['deleted'],
+            },
+            'tags': {
+                'changed': tags.order_by('id'),
+                'deleted': changes['tag']['deleted'],
+            },
+            'ingredients': {
+                'changed': ingredients.order_by('id'),
+                'deleted': changes['ingredient']['deleted'],
+            },
+        }, context={'request': request})
+
+        return serializer.data
@@ -0,0 +1,45 @@
+"""
+Tests for query count and wall time budgets of the user API
+"""
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.tests.query_budget import QueryBudgetMixin
+
+
+class UserQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test the user API routes stay within their budgets"""
+    budget_file = Path(__file__).with_name('query_budgets.json')
+    budget_namespaces = ('user',)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@test.test',
+            password='testpass123',
+            name='Test Name'
+        )
+
+    def test_user_routes(self):
+        """Test creating users and tokens and managing the profile"""
+        self.assertWithinBudget(
+            'post', 'user:create', status=status.HTTP_201_CREATED,
+            data={
+                'email': 'new@test.test',
+                'password': 'testpass123',
+                'name': 'New User'
+            }
+        )
+        self.assertWithinBudget(
+            'post', 'user:token',
+            data={'email': 'user@test.test', 'password': 'testpass123'}
+        )
+
+        self.client.force_authenticate(user=self.user)
+        self.assertWithinBudget('get', 'user:me')
+        self.assertWithinBudget('patch', 'user:me', data={'name': 'Renamed'})